@@ -1,7 +1,8 @@
 """
 AI Integration package
 """
-from .claude_client import ClaudeClient
+from .claude_client import ClaudeClient, get_claude_client
 from .prompts import PromptManager
+from .response_cache import ResponseCache
 
-__all__ = ['ClaudeClient', 'PromptManager']
+__all__ = ['ClaudeClient', 'get_claude_client', 'PromptManager', 'ResponseCache']
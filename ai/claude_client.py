@@ -1,11 +1,66 @@
-import logging
 import asyncio
-from typing import Dict, List, Optional
-from openai import AsyncOpenAI, RateLimitError, APIStatusError
+import logging
+from typing import AsyncIterator, Dict, List, Optional
+import httpx
+from openai import (
+    AsyncOpenAI, DefaultAsyncHttpxClient, RateLimitError, APIStatusError, APITimeoutError
+)
 from config import Config
+from .prompts import PromptManager
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:  # HTTP/2 is optional, falls back to HTTP/1.1 keep-alive
+    HTTP2_AVAILABLE = False
 
 logger = logging.getLogger(__name__)
 
+# Keep-alive pool for OpenRouter; connections are reused across calls
+HTTP_LIMITS = httpx.Limits(max_connections=64, max_keepalive_connections=32, keepalive_expiry=60)
+
+# Per-request budget for practice generation; on timeout the HTTP request
+# itself is aborted, and it is not retried since the user is waiting on it
+PRACTICE_TIMEOUT = httpx.Timeout(connect=5.0, read=120.0, write=30.0, pool=5.0)
+
+# Server-side errors that the SDK retries on the same model
+RETRYABLE_STATUS_CODES = {500, 502, 503, 504}
+
+# Retries of 429/5xx for requests with their own timeout, and the backoff
+# before each (seconds); the SDK can't retry these without also retrying timeouts
+DEADLINE_RETRY_DELAYS = (1.0, 3.0)
+
+# Providers that need explicit cache_control breakpoints for prompt caching
+# (OpenAI models on OpenRouter cache repeated prefixes automatically)
+PROMPT_CACHE_MODEL_PREFIXES = ("anthropic/", "google/gemini-2.5")
+
+# Free models to fall back to when the primary free model fails
+FALLBACK_MODELS = (
+    "google/gemini-2.0-flash-exp:free",
+    "google/gemini-flash-1.5-8b:free",
+    "meta-llama/llama-3.2-3b-instruct:free",
+    "meta-llama/llama-3.1-8b-instruct:free",
+    "qwen/qwen-2.5-72b-instruct:free",
+    "mistralai/mistral-7b-instruct:free",
+    "microsoft/phi-3-medium-128k-instruct:free",
+    "huggingfaceh4/zephyr-7b-beta:free",
+    "google/gemini-flash-1.5:free",
+)
+
+
+def _cache_block(model_name: str, role: str, text: str) -> Dict:
+    """Build a stable prefix message, marking it cacheable where supported"""
+    if model_name.startswith(PROMPT_CACHE_MODEL_PREFIXES):
+        return {
+            "role": role,
+            "content": [{
+                "type": "text",
+                "text": text,
+                "cache_control": {"type": "ephemeral"}
+            }]
+        }
+    return {"role": role, "content": text}
+
 
 class ClaudeClient:
     """Client for interacting with AI models via OpenRouter API"""
@@ -14,7 +69,9 @@ class ClaudeClient:
         self,
         system_prompt: str,
         user_message: str,
-        conversation_history: Optional[List[Dict]] = None
+        conversation_history: Optional[List[Dict]] = None,
+        context_message: Optional[str] = None,
+        timeout: Optional[httpx.Timeout] = None
     ) -> str:
         """
         Generate AI response using OpenRouter
@@ -23,16 +80,21 @@ class ClaudeClient:
             system_prompt: System instructions for the AI
             user_message: User's message or request
             conversation_history: Previous conversation messages
+            context_message: Per-user context that is stable across calls
+                (e.g. profile), sent right after the system prompt so it
+                stays part of the cacheable prefix
+            timeout: Per-request timeout; when set, a timed out request is
+                raised as APITimeoutError without retries or fallbacks
             
         Returns:
             Generated response text
         """
         try:
-            logger.info(f"Generating AI response. System prompt length: {len(system_prompt)}")
-            messages = [{"role": "system", "content": system_prompt}]
+            logger.info("Generating AI response. System prompt length: %d", len(system_prompt))
+            messages = []
             
             if conversation_history:
-                logger.info(f"Including {len(conversation_history)} history messages")
+                logger.info("Including %d history messages", len(conversation_history))
                 messages.extend(conversation_history)
             
             messages.append({
@@ -40,80 +102,167 @@ class ClaudeClient:
                 "content": user_message
             })
             
-            # List of models to try (primary + fallbacks)
-            models_to_try = [self.model]
-            
-            # Add free fallbacks if the primary is a free model
-            if self.model.endswith(':free'):
-                fallbacks = [
-                    "google/gemini-2.0-flash-exp:free",
-                    "google/gemini-flash-1.5-8b:free",
-                    "meta-llama/llama-3.2-3b-instruct:free",
-                    "meta-llama/llama-3.1-8b-instruct:free",
-                    "qwen/qwen-2.5-72b-instruct:free",
-                    "mistralai/mistral-7b-instruct:free",
-                    "microsoft/phi-3-medium-128k-instruct:free",
-                    "huggingfaceh4/zephyr-7b-beta:free",
-                    "google/gemini-flash-1.5:free"
-                ]
-                for fb in fallbacks:
-                    if fb != self.model:
-                        models_to_try.append(fb)
-
             last_exception = None
-            for model_name in models_to_try:
+            for model_name in self.models_to_try:
                 try:
-                    logger.info(f"Trying model: {model_name}")
-                    response = await self.client.chat.completions.create(
-                        model=model_name,
-                        messages=messages,
-                        max_tokens=self.max_tokens,
-                        temperature=self.temperature,
+                    logger.info("Trying model: %s", model_name)
+                    response = await self._create_completion(
+                        model_name,
+                        self._build_prefix(model_name, system_prompt, context_message) + messages,
+                        timeout
                     )
                     return response.choices[0].message.content
+                except APITimeoutError as e:
+                    if timeout is not None:
+                        raise
+                    last_exception = e
+                    logger.warning("Timeout persisted for %s after retries, trying next...", model_name)
+                    continue
                 except RateLimitError as e:
                     last_exception = e
-                    logger.warning(f"Rate limit hit for {model_name}: {e}")
-                    # If it's a per-minute limit, a small wait might help
-                    await asyncio.sleep(2)
+                    logger.warning("Rate limit persisted for %s after retries, trying next...", model_name)
                     continue
                 except APIStatusError as e:
                     last_exception = e
-                    if e.status_code == 429:
-                        logger.warning(f"429 Status code for {model_name}, trying next...")
-                        await asyncio.sleep(1)
+                    if e.status_code in RETRYABLE_STATUS_CODES:
+                        logger.warning("%s persisted for %s after retries, trying next...", e.status_code, model_name)
                         continue
                     elif e.status_code == 404:
-                        logger.warning(f"Model {model_name} not found (404), trying next...")
+                        logger.warning("Model %s not found (404), trying next...", model_name)
                         continue
+                    elif 400 <= e.status_code < 500:
+                        # Other 4xx errors are caused by the request itself,
+                        # so another model would reject it as well
+                        logger.error("API Error %s with model %s: %s", e.status_code, model_name, e)
+                        break
                     else:
-                        logger.error(f"API Error {e.status_code} with model {model_name}: {e}")
+                        logger.error("API Error %s with model %s: %s", e.status_code, model_name, e)
                         continue
                 except Exception as e:
                     last_exception = e
-                    logger.error(f"Unexpected error with model {model_name}: {e}")
-                    # 404 usually means model is gone, so just continue
-                    if "404" in str(e):
-                        continue
-                    # For other errors, wait a bit
-                    await asyncio.sleep(1)
+                    logger.error("Unexpected error with model %s: %s", model_name, e)
                     continue
             
             # If we're here, all models failed
-            logger.error(f"All models failed. Last error: {last_exception}")
+            logger.error("All models failed. Last error: %s", last_exception)
             raise last_exception
             
         except Exception as e:
-            logger.error(f"Error generating AI response: {e}")
+            logger.error("Error generating AI response: %s", e)
             raise
 
+    @staticmethod
+    def _build_prefix(model_name: str, system_prompt: str, context_message: Optional[str]) -> List[Dict]:
+        """System prompt and optional user context, cacheable where supported"""
+        prefix = [_cache_block(model_name, "system", system_prompt)]
+        if context_message:
+            prefix.append(_cache_block(model_name, "user", context_message))
+        return prefix
+
+    async def stream_response(
+        self,
+        system_prompt: str,
+        user_message: str,
+        context_message: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """
+        Stream AI response text as it is generated
+        
+        Falls back to the next model only when a model fails before
+        streaming starts; errors mid-stream are raised to the caller.
+        
+        Args:
+            system_prompt: System instructions for the AI
+            user_message: User's message or request
+            context_message: Per-user context placed after the system prompt
+            
+        Yields:
+            Response text chunks
+        """
+        messages = [{"role": "user", "content": user_message}]
+        last_exception = None
+        for model_name in self.models_to_try:
+            try:
+                logger.info("Streaming from model: %s", model_name)
+                stream = await self.client.chat.completions.create(
+                    model=model_name,
+                    messages=self._build_prefix(model_name, system_prompt, context_message) + messages,
+                    max_tokens=self.max_tokens,
+                    temperature=self.temperature,
+                    stream=True,
+                )
+            except APIStatusError as e:
+                last_exception = e
+                if 400 <= e.status_code < 500 and e.status_code not in (404, 429):
+                    logger.error("API Error %s with model %s: %s", e.status_code, model_name, e)
+                    raise
+                logger.warning("%s for %s, trying next...", e.status_code, model_name)
+                continue
+            except Exception as e:
+                last_exception = e
+                logger.error("Unexpected error with model %s: %s", model_name, e)
+                continue
+            
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+            return
+        
+        logger.error("All models failed. Last error: %s", last_exception)
+        raise last_exception
+
+    async def _create_completion(
+        self,
+        model_name: str,
+        messages: List[Dict],
+        timeout: Optional[httpx.Timeout] = None
+    ):
+        """
+        Call a single model. Transient errors (429/5xx, timeouts) are retried
+        by the SDK with exponential backoff, honoring Retry-After headers.
+        A request with its own timeout is aborted when it expires and not
+        retried; 429/5xx are still retried after DEADLINE_RETRY_DELAYS
+        """
+        if timeout is None:
+            return await self.client.chat.completions.create(
+                model=model_name,
+                messages=messages,
+                max_tokens=self.max_tokens,
+                temperature=self.temperature,
+            )
+        for delay in DEADLINE_RETRY_DELAYS + (None,):
+            try:
+                return await self.single_attempt_client.chat.completions.create(
+                    model=model_name,
+                    messages=messages,
+                    max_tokens=self.max_tokens,
+                    temperature=self.temperature,
+                    timeout=timeout,
+                )
+            except APIStatusError as e:
+                transient = e.status_code == 429 or e.status_code in RETRYABLE_STATUS_CODES
+                if delay is None or not transient:
+                    raise
+                logger.warning("%s from %s, retrying in %.0fs", e.status_code, model_name, delay)
+                await asyncio.sleep(delay)
+
     def __init__(self):
         self.client = AsyncOpenAI(
             base_url=Config.OPENROUTER_BASE_URL,
             api_key=Config.OPENROUTER_API_KEY,
             timeout=120.0,
+            max_retries=Config.MAX_RETRIES,
+            http_client=DefaultAsyncHttpxClient(http2=HTTP2_AVAILABLE, limits=HTTP_LIMITS),
         )
+        # Same connection pool, no SDK retries: for calls with a deadline,
+        # see _create_completion
+        self.single_attempt_client = self.client.with_options(max_retries=0)
         self.model = Config.OPENROUTER_MODEL
+        # Primary model first; free fallbacks only when the primary is free
+        if self.model.endswith(':free'):
+            self.models_to_try = (self.model,) + tuple(m for m in FALLBACK_MODELS if m != self.model)
+        else:
+            self.models_to_try = (self.model,)
         self.max_tokens = Config.MAX_TOKENS
         self.temperature = Config.TEMPERATURE
     
@@ -135,12 +284,12 @@ class ClaudeClient:
             
         Returns:
             Dictionary with practice content and metadata
+            
+        Raises:
+            APITimeoutError: The model did not answer within PRACTICE_TIMEOUT
         """
-        from .prompts import PromptManager
-        
         system_prompt = PromptManager.get_practice_generation_prompt()
         user_prompt = PromptManager.format_practice_request(
-            user_data=user_data,
             practice_type=practice_type,
             duration=duration,
             module_context=module_context
@@ -148,7 +297,9 @@ class ClaudeClient:
         
         response = await self.generate_response(
             system_prompt=system_prompt,
-            user_message=user_prompt
+            user_message=user_prompt,
+            context_message=PromptManager.format_user_context(user_data),
+            timeout=PRACTICE_TIMEOUT
         )
         
         # Parse response into structured format
@@ -171,8 +322,6 @@ class ClaudeClient:
         Returns:
             AI-generated response
         """
-        from .prompts import PromptManager
-        
         system_prompt = PromptManager.get_onboarding_prompt()
         user_prompt = PromptManager.format_onboarding_message(
             user_message=user_message,
@@ -200,22 +349,39 @@ class ClaudeClient:
         Returns:
             AI-generated response
         """
-        from .prompts import PromptManager
-        
         logger.info("Starting general response generation")
         system_prompt = PromptManager.get_general_chat_prompt()
         
-        # Add user profile to the message for context
-        profile_context = PromptManager._format_user_data(user_data)
-        full_user_message = f"ПРОФІЛЬ КОРИСТУВАЧА:\n{profile_context}\n\nПИТАННЯ: {user_message}"
-        
-        logger.info(f"Full user message prepared, length: {len(full_user_message)}")
-        
+        # User profile goes in its own message ahead of the question,
+        # so it stays cacheable across this user's turns
         return await self.generate_response(
             system_prompt=system_prompt,
-            user_message=full_user_message
+            user_message=f"ПИТАННЯ: {user_message}",
+            context_message=PromptManager.format_user_context(user_data)
         )
     
+    async def stream_general_response(
+        self,
+        user_message: str,
+        user_data: Dict
+    ) -> AsyncIterator[str]:
+        """
+        Stream response to general user messages
+        
+        Args:
+            user_message: User's message
+            user_data: User context data (profile)
+            
+        Yields:
+            Response text chunks
+        """
+        async for chunk in self.stream_response(
+            system_prompt=PromptManager.get_general_chat_prompt(),
+            user_message=f"ПИТАННЯ: {user_message}",
+            context_message=PromptManager.format_user_context(user_data)
+        ):
+            yield chunk
+    
     async def generate_summary(
         self,
         practice_content: str
@@ -229,8 +395,6 @@ class ClaudeClient:
         Returns:
             Short summary (max 500 characters)
         """
-        from .prompts import PromptManager
-        
         system_prompt = PromptManager.get_practice_summary_prompt()
         user_prompt = f"Зроби короткий підсумок цієї практики (макс 500 символів):\n\n{practice_content}"
         
@@ -256,18 +420,16 @@ class ClaudeClient:
         Returns:
             Personalized insight message
         """
-        from .prompts import PromptManager
-        
         system_prompt = PromptManager.get_insight_generation_prompt()
         user_prompt = PromptManager.format_insight_request(
-            user_progress=user_progress,
             practice_history=practice_history,
             module_info=module_info
         )
         
         return await self.generate_response(
             system_prompt=system_prompt,
-            user_message=user_prompt
+            user_message=user_prompt,
+            context_message=PromptManager.format_progress_context(user_progress)
         )
     
     def _parse_practice_response(self, response: str) -> Dict:
@@ -288,3 +450,14 @@ class ClaudeClient:
             "tips": [],
             "modifications": []
         }
+
+
+_client: Optional[ClaudeClient] = None
+
+
+def get_claude_client() -> ClaudeClient:
+    """Shared ClaudeClient, so all handlers reuse one connection pool"""
+    global _client
+    if _client is None:
+        _client = ClaudeClient()
+    return _client
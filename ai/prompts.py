@@ -53,7 +53,7 @@ class PromptManager:
 СТИЛЬ:
 - Використовуй емодзі для візуальної структури.
 - Тільки українська мова.
-- Інструкції мають бути прямими та дієвими.
+- Інструкції мають бути прямими та дієвими, без зайвих пояснень техніки. Зосередься на діях.
 - Враховуй рівень досвіду та стан здоров'я користувача.
 
 Приклад ідеальної відповіді:
@@ -155,55 +155,50 @@ class PromptManager:
 """
         return context
     
+    @staticmethod
+    def format_user_context(user_data: Dict) -> str:
+        """Format user profile as a standalone context message"""
+        return f"ПРОФІЛЬ КОРИСТУВАЧА:\n{PromptManager._format_user_data(user_data)}"
+    
+    @staticmethod
+    def format_progress_context(user_progress: Dict) -> str:
+        """Format user progress as a standalone context message"""
+        return f"""ПРОГРЕС КОРИСТУВАЧА:
+- Завершено практик: {user_progress.get('practices_completed', 0)}
+- Загальний час практики: {user_progress.get('total_practice_time', 0)} хв
+- Середня оцінка: {user_progress.get('average_rating', 'N/A')}"""
+    
     @staticmethod
     def format_practice_request(
-        user_data: Dict,
         practice_type: str,
         duration: int,
         module_context: Optional[Dict] = None
     ) -> str:
-        """Format practice generation request"""
+        """
+        Format practice generation request. Only per-request values go here:
+        the response format lives in the cached system prompt and the
+        profile is sent separately
+        """
         context = f"""
-СТВОРИ ПРАКТИКУ:
+СТВОРИ ПРАКТИКУ ДЛЯ ЦЬОГО КОРИСТУВАЧА:
 
 ТИП: {practice_type}
 ТРИВАЛІСТЬ: {duration} хвилин
 
-ПРОФІЛЬ КОРИСТУВАЧА:
-{PromptManager._format_user_data(user_data)}
-
 КОНТЕКСТ МОДУЛЯ:
 {PromptManager._format_module_context(module_context) if module_context else "Базова практика"}
-
-ФОРМАТ ВІДПОВІДІ:
-Спрямуй відповідь СУВОРО за структуРОЮ (обмеження до 1000 символів):
-- 🧘 [Назва]
-- [Тривалість] хв [підзаголовок]
-- Підготовка ([час] хв)
-- Розминка ([час] хв)
-- Основна частина ([час] хв)
-- Завершення ([час] хв)
-- ✨ [Порада]
-
-Пиши українською, лаконічно, без зайвих пояснень техніки. Зосередься на діях.
 """
         return context
     
     @staticmethod
     def format_insight_request(
-        user_progress: Dict,
         practice_history: List[Dict],
         module_info: Dict
     ) -> str:
-        """Format insight generation request"""
+        """Format insight generation request (progress is sent separately)"""
         context = f"""
 ЗГЕНЕРУЙ ПЕРСОНАЛІЗОВАНИЙ ІНСАЙТ:
 
-ПРОГРЕС КОРИСТУВАЧА:
-- Завершено практик: {user_progress.get('practices_completed', 0)}
-- Загальний час практики: {user_progress.get('total_practice_time', 0)} хв
-- Середня оцінка: {user_progress.get('average_rating', 'N/A')}
-
 ОСТАННІ ПРАКТИКИ:
 {PromptManager._format_practice_history(practice_history)}
 
@@ -0,0 +1,80 @@
+"""
+Response cache for general chat
+Stores AI answers in Redis so repeated questions skip the model call
+"""
+import hashlib
+import json
+import logging
+import time
+from typing import Dict, Optional
+from config import Config
+
+try:
+    import orjson
+except ImportError:  # Falls back to stdlib json
+    orjson = None
+
+try:
+    import redis.asyncio as redis
+except ImportError:  # Redis is optional
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCache:
+    """Exact-match cache of AI answers keyed by user profile and question"""
+    
+    KEY_PREFIX = "yoga_bot:chat:"
+    # How long to stop hitting Redis after a connection failure
+    RETRY_AFTER = 60.0
+    
+    def __init__(self, url: Optional[str] = None, ttl: Optional[int] = None):
+        self.ttl = Config.RESPONSE_CACHE_TTL if ttl is None else ttl
+        url = url or Config.REDIS_URL
+        self._redis = redis.from_url(url, decode_responses=True) if (redis and url and self.ttl) else None
+        self._disabled_until = 0.0
+    
+    @staticmethod
+    def _normalize(text: str) -> str:
+        """Normalize case, whitespace and trailing punctuation"""
+        return ' '.join(text.lower().split()).strip(' ?!.')
+    
+    @staticmethod
+    def _dump_profile(user_data: Dict) -> bytes:
+        """Serialize the profile deterministically (orjson when available)"""
+        if orjson is not None:
+            return orjson.dumps(user_data, option=orjson.OPT_SORT_KEYS, default=str)
+        return json.dumps(user_data, sort_keys=True, ensure_ascii=False, default=str).encode()
+    
+    def make_key(self, text: str, user_data: Dict) -> str:
+        """Build cache key from the user profile and normalized question"""
+        payload = self._dump_profile(user_data) + b"\x00" + self._normalize(text).encode()
+        digest = hashlib.sha256(payload).hexdigest()
+        return f"{self.KEY_PREFIX}{digest}"
+    
+    def _available(self) -> bool:
+        return self._redis is not None and time.monotonic() >= self._disabled_until
+    
+    def _on_error(self, e: Exception):
+        logger.warning("Response cache unavailable, bypassing for %.0fs: %s", self.RETRY_AFTER, e)
+        self._disabled_until = time.monotonic() + self.RETRY_AFTER
+    
+    async def get(self, text: str, user_data: Dict) -> Optional[str]:
+        """Return cached answer or None"""
+        if not self._available():
+            return None
+        try:
+            return await self._redis.get(self.make_key(text, user_data))
+        except Exception as e:
+            self._on_error(e)
+            return None
+    
+    async def set(self, text: str, user_data: Dict, response: str):
+        """Store answer with TTL"""
+        if not self._available() or not response:
+            return
+        try:
+            await self._redis.set(self.make_key(text, user_data), response, ex=self.ttl)
+        except Exception as e:
+            self._on_error(e)
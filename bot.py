@@ -2,17 +2,27 @@
 Main bot application
 Initializes and runs the Telegram bot
 """
+import asyncio
 import logging
-import pytz
+import time
 from datetime import datetime
-from telegram import Update, ReplyKeyboardMarkup, ReplyKeyboardRemove, InlineKeyboardButton, InlineKeyboardMarkup
+from urllib.parse import urlparse
+from zoneinfo import ZoneInfo
+from sqlalchemy import bindparam, select, func
+from telegram import Update, ReplyKeyboardRemove, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import Application, CommandHandler, MessageHandler, ConversationHandler, CallbackQueryHandler, filters, ContextTypes
 from config import Config
-from database import SessionLocal, User, Practice, init_db
+from database import (
+    SessionLocal, Practice, resolve_user_id, get_user_by_telegram_async,
+    flush_activity, ACTIVITY_FLUSH_INTERVAL
+)
 from handlers import start_command, help_command, show_main_menu, OnboardingHandler, PracticeHandler, ProfileHandler, RemindersHandler
 from handlers.onboarding_handler import O_GOALS, O_EXPERIENCE, O_HEALTH, O_DURATION, O_REMINDER_FREQ, O_REMINDER_TIME, O_CONFIRMATION
 from handlers.profile_handler import PROFILE_MENU, EDIT_GOALS, EDIT_EXPERIENCE, EDIT_HEALTH, EDIT_DURATION
 from handlers.reminders_handler import REMINDER_FREQ, REMINDER_TIME
+from handlers.keyboards import KB_PROGRESS_NAV, KB_SETTINGS
+from ai import get_claude_client, ResponseCache
+from verify_startup import build_application
 
 # Configure logging
 logging.basicConfig(
@@ -21,151 +31,221 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Timezones for displaying practice dates (stored in UTC)
+KYIV_TZ = ZoneInfo('Europe/Kyiv')
+UTC = ZoneInfo('UTC')
+
+# Minimum seconds between edits of a streamed reply (Telegram rate-limits edits)
+STREAM_EDIT_INTERVAL = 1.0
+TELEGRAM_MESSAGE_LIMIT = 4096
+
+# Practice type icons for the progress list
+EMOJI_BY_TYPE = {'asana': '🧘', 'pranayama': '🌬️'}
+DEFAULT_PRACTICE_EMOJI = '🧘‍♀️'
+
+# Completed practices per /progress page
+PROGRESS_PAGE_SIZE = 5
+
+# Seconds a getUpdates long poll waits for new updates before returning empty
+POLL_TIMEOUT = 30
+
+# Progress page with total count; built once so its compiled SQL is reused
+PROGRESS_PAGE_STMT = (
+    select(Practice, func.count().over().label('total'))
+    .where(Practice.user_id == bindparam('uid'), Practice.completed == True)
+    .order_by(Practice.completed_at.desc())
+    .offset(bindparam('offset'))
+    .limit(bindparam('limit'))
+)
+
+
+def _fetch_progress_page(telegram_id: int, page: int):
+    """
+    Load a page of the user's completed practices. Blocking: run in a thread.
+    
+    Returns:
+        (page, rows), falling back to the first page when the requested
+        one is past the end, or None if the user is unknown
+    """
+    with SessionLocal() as db:
+        user_id = resolve_user_id(db, telegram_id)
+        if user_id is None:
+            return None
+        
+        # Page rows and total count in one round trip
+        def fetch_page(page_num):
+            return db.execute(PROGRESS_PAGE_STMT, {
+                'uid': user_id,
+                'offset': (page_num - 1) * PROGRESS_PAGE_SIZE,
+                'limit': PROGRESS_PAGE_SIZE,
+            }).all()
+        
+        if page < 1: page = 1
+        rows = fetch_page(page)
+        if not rows and page > 1:
+            # Requested page is past the end (e.g. stale button), show the first one
+            page = 1
+            rows = fetch_page(page)
+        return page, rows
+
+
+async def send_long(message, text: str):
+    """Reply with text split into messages of at most TELEGRAM_MESSAGE_LIMIT characters"""
+    for start in range(0, len(text), TELEGRAM_MESSAGE_LIMIT):
+        await message.reply_text(text[start:start + TELEGRAM_MESSAGE_LIMIT])
+
+
+async def reply_streamed(message, chunks) -> str:
+    """
+    Reply with text as it streams in, editing a placeholder message
+    at most once per STREAM_EDIT_INTERVAL. Returns the full text.
+    """
+    sent = await message.reply_text("⏳")
+    text = ""
+    shown = ""
+    last_edit = time.monotonic()
+    try:
+        async for chunk in chunks:
+            text += chunk
+            if time.monotonic() - last_edit >= STREAM_EDIT_INTERVAL:
+                preview = text[:TELEGRAM_MESSAGE_LIMIT]
+                if preview.strip() and preview != shown:
+                    await sent.edit_text(preview)
+                    shown = preview
+                last_edit = time.monotonic()
+    except Exception:
+        # Nothing useful was shown yet, so don't leave the placeholder behind
+        if not shown:
+            await sent.delete()
+        raise
+
+    if not text.strip():
+        await sent.delete()
+        raise ValueError("Empty AI response")
+
+    head, rest = text[:TELEGRAM_MESSAGE_LIMIT], text[TELEGRAM_MESSAGE_LIMIT:]
+    if head != shown:
+        await sent.edit_text(head)
+    await send_long(message, rest)
+    return text
+
 
 async def progress_command(update: Update, context: ContextTypes.DEFAULT_TYPE, page: int = 1):
     """Handle /progress command with pagination"""
     user = update.effective_user
     is_callback = update.callback_query is not None
     
-    # Timezone for Kyiv
-    kyiv_tz = pytz.timezone('Europe/Kyiv')
-    items_per_page = 5
+    result = await asyncio.to_thread(_fetch_progress_page, user.id, page)
+    if result is None:
+        msg = "Спочатку пройди онбординг! 😊"
+        if is_callback:
+            await update.callback_query.answer()
+            await update.callback_query.edit_message_text(msg)
+        else:
+            await update.message.reply_text(msg)
+        return
+    page, rows = result
     
-    with SessionLocal() as db:
-        db_user = db.query(User).filter(User.telegram_id == user.id).first()
-        if not db_user:
-            msg = "Спочатку пройди онбординг! 😊"
-            if is_callback:
-                await update.callback_query.answer()
-                await update.callback_query.edit_message_text(msg)
-            else:
-                await update.message.reply_text(msg)
-            return
-            
-        # Total count for pagination
-        total_practices = db.query(Practice).filter(
-            Practice.user_id == db_user.id,
-            Practice.completed == True
-        ).count()
-        
-        if total_practices == 0:
-            msg = "У тебе ще немає завершених практик. Давай почнемо сьогодні! 🧘‍♂️"
-            if is_callback:
-                await update.callback_query.answer()
-                await update.callback_query.edit_message_text(msg)
-            else:
-                await update.message.reply_text(msg)
-            return
-            
-        total_pages = (total_practices + items_per_page - 1) // items_per_page
-        if page > total_pages: page = total_pages
-        if page < 1: page = 1
+    if not rows:
+        msg = "У тебе ще немає завершених практик. Давай почнемо сьогодні! 🧘‍♂️"
+        if is_callback:
+            await update.callback_query.answer()
+            await update.callback_query.edit_message_text(msg)
+        else:
+            await update.message.reply_text(msg)
+        return
         
-        # Get practices for current page
-        offset = (page - 1) * items_per_page
-        practices = db.query(Practice).filter(
-            Practice.user_id == db_user.id,
-            Practice.completed == True
-        ).order_by(Practice.completed_at.desc()).offset(offset).limit(items_per_page).all()
+    total_practices = rows[0].total
+    total_pages = (total_practices + PROGRESS_PAGE_SIZE - 1) // PROGRESS_PAGE_SIZE
+    practices = [row.Practice for row in rows]
+    
+    parts = [f"📊 **Твій прогрес та підсумки (Сторінка {page}/{total_pages}):**\n\n"]
+    for p in practices:
+        local_dt = p.completed_at.replace(tzinfo=UTC).astimezone(KYIV_TZ)
+        date_str = local_dt.strftime("%d.%m %H:%M")
         
-        progress_text = f"📊 **Твій прогрес та підсумки (Сторінка {page}/{total_pages}):**\n\n"
-        for p in practices:
-            local_dt = p.completed_at.replace(tzinfo=pytz.utc).astimezone(kyiv_tz)
-            date_str = local_dt.strftime("%d.%m %H:%M")
-            
-            emoji = "🧘" if p.practice_type == 'asana' else "🌬️" if p.practice_type == 'pranayama' else "🧘‍♀️"
-            rating_stars = '⭐' * (p.rating or 0)
-            progress_text += f"{emoji} **{date_str}** — {p.duration} хв {rating_stars}\n"
-            if p.feedback:
-                progress_text += f"💭 _{p.feedback}_\n"
-            progress_text += "───────────────\n"
-            
-        # Inline buttons for pagination
-        buttons = []
-        if total_pages > 1:
-            row = []
-            if page > 1:
-                row.append(InlineKeyboardButton("<< Назад", callback_data=f"prog_{page-1}"))
-            if page < total_pages:
-                row.append(InlineKeyboardButton("Вперед >>", callback_data=f"prog_{page+1}"))
-            buttons.append(row)
-            
-        inline_markup = InlineKeyboardMarkup(buttons) if buttons else None
+        emoji = EMOJI_BY_TYPE.get(p.practice_type, DEFAULT_PRACTICE_EMOJI)
+        rating_stars = '⭐' * (p.rating or 0)
+        parts.append(f"{emoji} **{date_str}** — {p.duration} хв {rating_stars}\n")
+        if p.feedback:
+            parts.append(f"💭 _{p.feedback}_\n")
+        parts.append("───────────────\n")
+    progress_text = ''.join(parts)
         
-        # Main menu keyboard (ReplyKeyboardMarkup) to keep it visible
-        main_keyboard = [
-            ['Розпочати практику 🧘'],
-            ['Мій профіль 👤', 'Налаштування ⚙️'],
-            ['Допомога 💡', 'Назад 🔙']
-        ]
-        reply_markup = ReplyKeyboardMarkup(main_keyboard, one_time_keyboard=False, resize_keyboard=True)
+    # Inline buttons for pagination
+    buttons = []
+    if total_pages > 1:
+        row = []
+        if page > 1:
+            row.append(InlineKeyboardButton("<< Назад", callback_data=f"prog_{page-1}"))
+        if page < total_pages:
+            row.append(InlineKeyboardButton("Вперед >>", callback_data=f"prog_{page+1}"))
+        buttons.append(row)
         
-        if is_callback:
-            await update.callback_query.answer()
-            await update.callback_query.edit_message_text(
-                progress_text, 
-                parse_mode='Markdown', 
-                reply_markup=inline_markup
-            )
-        else:
-            await update.message.reply_text(
-                progress_text, 
-                parse_mode='Markdown', 
-                reply_markup=inline_markup
-            )
-            # Send/refresh the reply keyboard separately if needed, 
-            # though PTB usually keeps the last reply keyboard. 
-            # But here we want to ensure it's there.
-            await update.message.reply_text("Скористайся меню нижче для навігації:", reply_markup=reply_markup)
+    inline_markup = InlineKeyboardMarkup(buttons) if buttons else None
+    
+    if is_callback:
+        await update.callback_query.answer()
+        await update.callback_query.edit_message_text(
+            progress_text, 
+            parse_mode='Markdown', 
+            reply_markup=inline_markup
+        )
+    else:
+        await update.message.reply_text(
+            progress_text, 
+            parse_mode='Markdown', 
+            reply_markup=inline_markup
+        )
+        # Send/refresh the reply keyboard separately if needed, 
+        # though PTB usually keeps the last reply keyboard. 
+        # But here we want to ensure it's there.
+        await update.message.reply_text("Скористайся меню нижче для навігації:", reply_markup=KB_PROGRESS_NAV)
 
 
 async def settings_command(update, context):
     """Handle /settings command"""
-    keyboard = [
-        ['Профіль 👤', 'Нагадування ⏰'],
-        ['Мова 🌐', 'Назад 🔙']
-    ]
-    reply_markup = ReplyKeyboardMarkup(keyboard, one_time_keyboard=True, resize_keyboard=True)
-    
     await update.message.reply_text(
         "⚙️ **Налаштування**\n\n"
         "Обери розділ, який хочеш змінити:",
-        reply_markup=reply_markup,
+        reply_markup=KB_SETTINGS,
         parse_mode='Markdown'
     )
 
 
+async def flush_activity_job(context: ContextTypes.DEFAULT_TYPE):
+    """Job callback: write batched last_active updates"""
+    await flush_activity()
+
+
 def main():
     """Main function to run the bot"""
-    logger.info("Initializing database...")
-    init_db()
-    
-    onboarding_handler = OnboardingHandler()
-    practice_handler = PracticeHandler()
-    profile_handler = ProfileHandler()
-    reminders_handler = RemindersHandler()
-
     async def post_init(application: Application):
-        """Restore reminders from database on startup"""
-        logger.info("Restoring reminders...")
-        with SessionLocal() as db:
-            users_with_reminders = db.query(User).filter(
-                User.notifications_enabled == True,
-                User.reminder_time != None,
-                User.reminder_frequency != None
-            ).all()
-            
-            for user in users_with_reminders:
-                try:
-                    hour, minute = map(int, user.reminder_time.split(':'))
-                    reminders_handler.schedule_user_reminder(
-                        application, user.telegram_id, hour, minute, user.reminder_frequency
-                    )
-                except Exception as e:
-                    logger.error(f"Failed to restore reminder for user {user.telegram_id}: {e}")
+        """Start the reminder sweeper and the activity flush"""
+        reminders_handler.start_sweeper(application.job_queue)
+        logger.info("Reminder sweeper started")
+        application.job_queue.run_repeating(
+            flush_activity_job, interval=ACTIVITY_FLUSH_INTERVAL, name="activity_flush"
+        )
+
+    async def post_shutdown(application: Application):
+        """Write activity recorded since the last flush"""
+        await flush_activity()
 
     logger.info("Creating bot application...")
-    application = Application.builder().token(Config.TELEGRAM_BOT_TOKEN).post_init(post_init).build()    
+    # Validates config and initializes the database before building
+    application = build_application(post_init=post_init, post_shutdown=post_shutdown)
+    if application is None:
+        raise SystemExit(1)
+    
+    # Built after validation: the AI client needs OPENROUTER_API_KEY
+    onboarding_handler = OnboardingHandler(settings_command=settings_command)
+    practice_handler = PracticeHandler()
+    profile_handler = ProfileHandler(settings_command=settings_command)
+    reminders_handler = RemindersHandler(settings_command=settings_command)
+    # Shared AI client keeps the HTTP connection pool warm between messages
+    ai_client = get_claude_client()
+    response_cache = ResponseCache()
     
     async def exit_and_start_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
         """End conversation and return to main menu"""
@@ -207,7 +287,7 @@ def main():
         entry_points=[
             CommandHandler('start', start_command),
             CommandHandler('onboarding', onboarding_handler.restart_onboarding),
-            MessageHandler(filters.Regex('^Так, почнімо! 🚀$'), onboarding_handler.finish_onboarding),
+            MessageHandler(filters.Text(['Так, почнімо! 🚀']), onboarding_handler.finish_onboarding),
         ],
         states={
             O_GOALS: [MessageHandler(filters.TEXT & ~filters.COMMAND, onboarding_handler.collect_goals)],
@@ -237,7 +317,7 @@ def main():
 
     # Reminders conversation handler
     reminder_conv = ConversationHandler(
-        entry_points=[MessageHandler(filters.Regex('^Нагадування ⏰$'), reminders_handler.start_reminder_settings)],
+        entry_points=[MessageHandler(filters.Text(['Нагадування ⏰']), reminders_handler.start_reminder_settings)],
         states={
             REMINDER_FREQ: [MessageHandler(filters.TEXT & ~filters.COMMAND, reminders_handler.handle_frequency)],
             REMINDER_TIME: [MessageHandler(filters.TEXT & ~filters.COMMAND, reminders_handler.handle_time)],
@@ -256,8 +336,7 @@ def main():
     profile_conv = ConversationHandler(
         entry_points=[
             CommandHandler('profile', profile_handler.show_profile),
-            MessageHandler(filters.Regex('^Мій профіль 👤$'), profile_handler.show_profile),
-            MessageHandler(filters.Regex('^Профіль 👤$'), profile_handler.show_profile)
+            MessageHandler(filters.Text(['Мій профіль 👤', 'Профіль 👤']), profile_handler.show_profile)
         ],
         states={
             PROFILE_MENU: [MessageHandler(filters.TEXT & ~filters.COMMAND, profile_handler.handle_profile_menu)],
@@ -314,102 +393,129 @@ def main():
     application.add_handler(CallbackQueryHandler(global_callback_handler))
     
     # Message handler for practice flow and fallback
+    def pop_flow_then(handler):
+        """Wrap a menu handler so it first leaves the current practice flow"""
+        async def wrapped(update, context):
+            context.user_data.pop('practice_flow', None)
+            await handler(update, context)
+        return wrapped
+
+    async def language_stub(update, context):
+        await update.message.reply_text("Ця функція незабаром з'явиться! 🚧")
+
+    # Global navigation buttons, checked before any flow
+    menu_dispatch = {
+        'Назад 🔙': pop_flow_then(show_main_menu),
+        'Налаштування ⚙️': pop_flow_then(settings_command),
+        'Розпочати практику 🧘': pop_flow_then(practice_handler.start_practice),
+        'Переглянути прогрес 📊': pop_flow_then(progress_command),
+        'Допомога 💡': pop_flow_then(help_command),
+        'Мій профіль 👤': pop_flow_then(profile_handler.show_profile),
+        'Профіль 👤': pop_flow_then(profile_handler.show_profile),
+        'Нагадування ⏰': reminders_handler.start_reminder_settings,
+        'Мова 🌐': language_stub,
+    }
+    # Practice flow steps, keyed by context.user_data['practice_flow']
+    flow_dispatch = {
+        'type_selection': practice_handler.handle_practice_type,
+        'reminder_setting': practice_handler.handle_reminder,
+        'rating': practice_handler.handle_rating,
+        'thoughts': practice_handler.handle_thoughts,
+    }
+    # Buttons outside of any flow
+    button_dispatch = {
+        'Завершив(ла) практику ✅': practice_handler.complete_practice,
+        'Відкласти на потім ⏰': practice_handler.complete_practice,
+        # These are handled by conversation handlers,
+        # but if they fall through, just show the main menu
+        'Готово ✅': show_main_menu,
+        'Так, почнімо! 🚀': show_main_menu,
+        'Рівень досвіду 📊': show_main_menu,
+        'Цілі 🎯': show_main_menu,
+        'Здоров\'я 💊': show_main_menu,
+        'Тривалість ⌛': show_main_menu,
+    }
+
     async def handle_message(update, context):
         """Route messages based on current flow"""
         text = update.message.text
         
-        # 1. Handle Global Navigation Buttons first
-        if text == 'Назад 🔙':
-            context.user_data.pop('practice_flow', None)
-            await show_main_menu(update, context)
-            return
-        elif text == 'Налаштування ⚙️':
-            context.user_data.pop('practice_flow', None)
-            await settings_command(update, context)
-            return
-        elif text == 'Розпочати практику 🧘':
-            context.user_data.pop('practice_flow', None)
-            await practice_handler.start_practice(update, context)
-            return
-        elif text == 'Переглянути прогрес 📊':
-            context.user_data.pop('practice_flow', None)
-            await progress_command(update, context)
-            return
-        elif text == 'Допомога 💡':
-            context.user_data.pop('practice_flow', None)
-            await help_command(update, context)
-            return
-        elif text in ['Мій профіль 👤', 'Профіль 👤']:
-            context.user_data.pop('practice_flow', None)
-            await profile_handler.show_profile(update, context)
-            return
-        elif text == 'Нагадування ⏰':
-            await reminders_handler.start_reminder_settings(update, context)
+        # 1. Global navigation buttons first, then the active flow, then other buttons
+        handler = menu_dispatch.get(text)
+        if handler is None:
+            handler = flow_dispatch.get(context.user_data.get('practice_flow')) or button_dispatch.get(text)
+        if handler is not None:
+            await handler(update, context)
             return
-        elif text == 'Мова 🌐':
-            await update.message.reply_text("Ця функція незабаром з'явиться! 🚧")
-            return
-            
-        # 2. Handle specific flows if no global button matched
-        flow = context.user_data.get('practice_flow')
-        if flow == 'type_selection':
-            await practice_handler.handle_practice_type(update, context)
-        elif flow == 'reminder_setting':
-            await practice_handler.handle_reminder(update, context)
-        elif flow == 'rating':
-            await practice_handler.handle_rating(update, context)
-        elif flow == 'thoughts':
-            await practice_handler.handle_thoughts(update, context)
-        elif text in ['Завершив(ла) практику ✅', 'Відкласти на потім ⏰']:
-            await practice_handler.complete_practice(update, context)
-        elif text in ['Готово ✅', 'Так, почнімо! 🚀', 'Рівень досвіду 📊', 'Цілі 🎯', 'Здоров\'я 💊', 'Тривалість ⌛', 'Мій профіль 👤', 'Профіль 👤']:
-            # These are handled by conversation handlers, 
-            # but if they fall through, just show the main menu
-            await show_main_menu(update, context)
-        else:
-            # 3. Fallback to AI Chat
-            from ai import ClaudeClient
-            ai_client = ClaudeClient()
-            
-            try:
-                # Fetch user data from DB for AI context
-                with SessionLocal() as db:
-                    db_user = db.query(User).filter(User.telegram_id == update.effective_user.id).first()
-                    user_profile = {
-                        'goals': db_user.goals if db_user else None,
-                        'experience_level': db_user.experience_level if db_user else None,
-                        'health_conditions': db_user.health_conditions if db_user else [],
-                        'available_duration': db_user.available_duration if db_user else None
-                    }
-
-                response = await ai_client.generate_general_response(
+        
+        # 2. Fallback to AI Chat
+        try:
+            # Fetch user data from DB for AI context
+            db_user = await get_user_by_telegram_async(update.effective_user.id)
+            user_profile = {
+                'goals': db_user.goals if db_user else None,
+                'experience_level': db_user.experience_level if db_user else None,
+                'health_conditions': db_user.health_conditions if db_user else [],
+                'available_duration': db_user.available_duration if db_user else None
+            }
+
+            response = await response_cache.get(text, user_profile)
+            if response is not None:
+                # Cached unsplit: long answers need the same chunking as streamed ones
+                await send_long(update.message, response)
+                return
+
+            # Stream the answer so the user sees it while it is generated
+            response = await reply_streamed(
+                update.message,
+                ai_client.stream_general_response(
                     user_message=text,
                     user_data=user_profile
                 )
-                await update.message.reply_text(response)
-            except Exception as e:
-                logger.error(f"Error generating AI response: {e}", exc_info=True)
-                await update.message.reply_text(
-                    "Вибач, я зараз не можу відповісти через технічні обмеження AI (можливо, перевищено ліміт запитів). 😥\n\n"
-                    "Спробуй пізніше або використовуй команди:\n"
-                    "/practice - Розпочати практику\n"
-                    "/progress - Переглянути прогрес\n"
-                    "/help - Допомога"
-                )
-    
+            )
+            await response_cache.set(text, user_profile, response)
+        except Exception as e:
+            logger.error("Error generating AI response: %s", e, exc_info=True)
+            await update.message.reply_text(
+                "Вибач, я зараз не можу відповісти через технічні обмеження AI (можливо, перевищено ліміт запитів). 😥\n\n"
+                "Спробуй пізніше або використовуй команди:\n"
+                "/practice - Розпочати практику\n"
+                "/progress - Переглянути прогрес\n"
+                "/help - Допомога"
+            )
+
     application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_message))
     
-    # application.post_init = post_init (Moved to builder)
-    
     logger.info("Starting bot...")
     logger.info("Bot is ready! Press Ctrl+C to stop.")
-    application.run_polling(allowed_updates=["message", "callback_query"])
+    allowed_updates = ["message", "callback_query"]
+    if Config.WEBHOOK_URL and not Config.DEBUG:
+        # Telegram pushes updates to us, no idle long-polling round trips
+        logger.info("Using webhook %s on port %s", Config.WEBHOOK_URL, Config.PORT)
+        application.run_webhook(
+            listen="0.0.0.0",
+            port=Config.PORT,
+            # Serve the path Telegram posts to, e.g. /telegram
+            url_path=urlparse(Config.WEBHOOK_URL).path,
+            webhook_url=Config.WEBHOOK_URL,
+            secret_token=Config.WEBHOOK_SECRET,
+            allowed_updates=allowed_updates
+        )
+    else:
+        application.run_polling(allowed_updates=allowed_updates, timeout=POLL_TIMEOUT)
 
 
 if __name__ == '__main__':
+    try:
+        import uvloop
+        # run_polling/run_webhook run on the current loop, so set it before main()
+        asyncio.set_event_loop(uvloop.new_event_loop())
+    except ImportError:  # optional, not available on Windows
+        pass
+    
     try:
         main()
     except KeyboardInterrupt:
         logger.info("Bot stopped by user")
     except Exception as e:
-        logger.error(f"Error: {e}", exc_info=True)
+        logger.error("Error: %s", e, exc_info=True)
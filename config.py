@@ -10,10 +10,19 @@ load_dotenv()
 
 
 class Config:
-    """Main configuration class"""
+    """
+    Main configuration class
+    
+    Importing this module has no side effects beyond loading .env;
+    entry points call Config.validate() before starting the bot.
+    """
     
     # Telegram Bot Configuration
     TELEGRAM_BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN')
+    # Webhook mode (used when WEBHOOK_URL is set and DEBUG is off)
+    WEBHOOK_URL = os.getenv('WEBHOOK_URL')
+    WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET')
+    PORT = int(os.getenv('PORT', '8080'))
     
     # OpenRouter API Configuration
     OPENROUTER_API_KEY = os.getenv('OPENROUTER_API_KEY')
@@ -22,6 +31,11 @@ class Config:
     
     # Database Configuration
     DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///yoga_bot.db')
+    # Connection pool (ignored for SQLite)
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '10'))
+    DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '20'))
+    DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', '30'))  # seconds
+    DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '1800'))  # seconds
     
     # Redis Configuration
     REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
@@ -29,6 +43,7 @@ class Config:
     # Application Settings
     DEBUG = os.getenv('DEBUG', 'False').lower() == 'true'
     LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+    SQL_TRACE = os.getenv('SQL_TRACE') == '1'  # Log every SQL statement
     
     # Bot Settings
     BOT_LANGUAGE = os.getenv('BOT_LANGUAGE', 'uk')
@@ -37,6 +52,8 @@ class Config:
     # AI Settings
     MAX_TOKENS = 2000
     TEMPERATURE = 0.7
+    MAX_RETRIES = 5  # SDK-level retries per model before falling back
+    RESPONSE_CACHE_TTL = int(os.getenv('RESPONSE_CACHE_TTL', 24 * 3600))  # seconds, 0 disables
     
     # Practice Settings
     PRACTICE_REMINDER_TIME = "09:00"  # Default reminder time
@@ -51,7 +68,3 @@ class Config:
         if not cls.OPENROUTER_API_KEY:
             raise ValueError("OPENROUTER_API_KEY is not set")
         return True
-
-
-# Validate configuration on import
-Config.validate()
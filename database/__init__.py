@@ -1,8 +1,16 @@
 """
 Database package initialization
 """
-from .models import Base, User, Practice, UserProgress, Module
-from .database import engine, SessionLocal, init_db, get_db
+from .models import Base, User, Practice, UserProgress, Module, Experience, ReminderFrequency
+from .database import (
+    engine, async_engine, SessionLocal, AsyncSessionLocal, init_db, get_db, get_async_db, upsert, utcnow
+)
+from .cache import (
+    resolve_user_id, get_user_by_telegram, get_user_by_telegram_async, get_cached_user,
+    get_cached_state, cache_state, invalidate_user
+)
+from .queries import incomplete_practices, get_latest_incomplete_practice
+from .activity import touch_user, flush_activity, ACTIVITY_FLUSH_INTERVAL
 
 __all__ = [
     'Base',
@@ -10,8 +18,27 @@ __all__ = [
     'Practice',
     'UserProgress',
     'Module',
+    'Experience',
+    'ReminderFrequency',
     'engine',
+    'async_engine',
     'SessionLocal',
+    'AsyncSessionLocal',
     'init_db',
-    'get_db'
+    'get_db',
+    'get_async_db',
+    'upsert',
+    'utcnow',
+    'resolve_user_id',
+    'get_user_by_telegram',
+    'get_user_by_telegram_async',
+    'get_cached_user',
+    'get_cached_state',
+    'cache_state',
+    'invalidate_user',
+    'incomplete_practices',
+    'get_latest_incomplete_practice',
+    'touch_user',
+    'flush_activity',
+    'ACTIVITY_FLUSH_INTERVAL'
 ]
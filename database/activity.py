@@ -0,0 +1,47 @@
+"""
+Batched writes of users.last_active
+"""
+import logging
+from sqlalchemy import update
+from .database import AsyncSessionLocal, utcnow
+from .models import User
+
+logger = logging.getLogger(__name__)
+
+# Seconds between flushes of pending activity
+ACTIVITY_FLUSH_INTERVAL = 5
+
+# Telegram ids seen since the last flush; the flush stamps them with the DB clock
+PENDING_ACTIVITY = set()
+
+
+def touch_user(telegram_id: int):
+    """Record user activity; written to the database by the next flush"""
+    PENDING_ACTIVITY.add(telegram_id)
+
+
+async def flush_activity() -> int:
+    """
+    Set last_active for all pending users in one UPDATE
+    
+    Returns:
+        Number of activity entries flushed
+    """
+    if not PENDING_ACTIVITY:
+        return 0
+    
+    # Swap the batch out before awaiting, so touches during the write go to the next one
+    pending = set(PENDING_ACTIVITY)
+    PENDING_ACTIVITY.clear()
+    try:
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(User).where(User.telegram_id.in_(pending)).values(last_active=utcnow())
+            )
+            await db.commit()
+    except Exception as e:
+        logger.error("Failed to write activity for %d users: %s", len(pending), e)
+        # Keep them for the next flush
+        PENDING_ACTIVITY.update(pending)
+        return 0
+    return len(pending)
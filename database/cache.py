@@ -0,0 +1,93 @@
+"""
+In-process caches for hot database lookups
+"""
+import asyncio
+import threading
+from typing import Optional
+from cachetools import TTLCache
+from sqlalchemy.orm import Session
+from .database import SessionLocal
+from .models import User
+
+# telegram_id -> users.id
+USER_ID_CACHE = TTLCache(maxsize=10_000, ttl=60)
+
+# telegram_id -> detached User row (read-only snapshot)
+USER_CACHE = TTLCache(maxsize=10_000, ttl=300)
+
+# telegram_id -> users.current_state as last written by this process
+USER_STATE_CACHE = TTLCache(maxsize=10_000, ttl=300)
+
+# TTLCache is not thread-safe and lookups also run in worker threads
+_lock = threading.Lock()
+
+
+def resolve_user_id(db: Session, telegram_id: int) -> Optional[int]:
+    """Get users.id for a Telegram user, hitting the database at most once per TTL"""
+    with _lock:
+        user_id = USER_ID_CACHE.get(telegram_id)
+    if user_id is not None:
+        return user_id
+    
+    user_id = db.query(User.id).filter(User.telegram_id == telegram_id).scalar()
+    if user_id is not None:
+        with _lock:
+            USER_ID_CACHE[telegram_id] = user_id
+    return user_id
+
+
+def get_user_by_telegram(db: Session, telegram_id: int) -> Optional[User]:
+    """
+    Get a User for reading, served from cache when possible.
+    The row is detached from the session: use a regular query to modify it.
+    """
+    with _lock:
+        db_user = USER_CACHE.get(telegram_id)
+    if db_user is not None:
+        return db_user
+    
+    db_user = db.query(User).filter(User.telegram_id == telegram_id).first()
+    if db_user is not None:
+        db.expunge(db_user)
+        with _lock:
+            USER_CACHE[telegram_id] = db_user
+    return db_user
+
+
+def _fetch_user(telegram_id: int) -> Optional[User]:
+    with SessionLocal() as db:
+        return get_user_by_telegram(db, telegram_id)
+
+
+def get_cached_user(telegram_id: int) -> Optional[User]:
+    """Cached User row, or None on a miss; never queries the database"""
+    with _lock:
+        return USER_CACHE.get(telegram_id)
+
+
+def get_cached_state(telegram_id: int) -> Optional[str]:
+    """Cached current_state, or None on a miss; never queries the database"""
+    with _lock:
+        return USER_STATE_CACHE.get(telegram_id)
+
+
+def cache_state(telegram_id: int, state: str):
+    """Remember the current_state just written for the user"""
+    with _lock:
+        USER_STATE_CACHE[telegram_id] = state
+
+
+async def get_user_by_telegram_async(telegram_id: int) -> Optional[User]:
+    """get_user_by_telegram for handlers: a cache miss queries in a worker thread"""
+    db_user = get_cached_user(telegram_id)
+    if db_user is not None:
+        return db_user
+    return await asyncio.to_thread(_fetch_user, telegram_id)
+
+
+def invalidate_user(telegram_id: int):
+    """Drop cached data after the user's row was written"""
+    with _lock:
+        USER_ID_CACHE.pop(telegram_id, None)
+        USER_CACHE.pop(telegram_id, None)
+        USER_STATE_CACHE.pop(telegram_id, None)
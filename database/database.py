@@ -1,27 +1,129 @@
 """
 Database connection and session management
 """
-from sqlalchemy import create_engine
+import logging
+from typing import AsyncIterator
+from sqlalchemy import DateTime, create_engine, event
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.sql.expression import FunctionElement
 from config import Config
 from .models import Base
 
+logger = logging.getLogger(__name__)
 
-# Create database engine
-engine = create_engine(
-    Config.DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in Config.DATABASE_URL else {},
-    echo=Config.DEBUG
-)
+IS_SQLITE = "sqlite" in Config.DATABASE_URL
 
-# Create session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# SQL statement logging is opt-in, independent of DEBUG
+if Config.SQL_TRACE:
+    logging.getLogger("sqlalchemy.engine").setLevel(logging.INFO)
+
+# Compiled SQL cache per engine (SQLAlchemy default is 500)
+QUERY_CACHE_SIZE = 1200
+
+# asyncio drivers for the same database URL
+ASYNC_DRIVERS = {
+    "sqlite://": "sqlite+aiosqlite://",
+    "postgresql://": "postgresql+asyncpg://",
+}
+
+
+def _async_url(url: str) -> str:
+    """Point DATABASE_URL at the asyncio driver of the same database"""
+    for prefix, async_prefix in ASYNC_DRIVERS.items():
+        if url.startswith(prefix):
+            return async_prefix + url[len(prefix):]
+    return url
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """WAL lets readers run concurrently with a writer"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
+
+# Create database engines: sync for scripts and legacy handlers,
+# async for handlers that must not block the event loop
+if IS_SQLITE:
+    engine = create_engine(
+        Config.DATABASE_URL,
+        connect_args={"check_same_thread": False},
+        echo=False,
+        query_cache_size=QUERY_CACHE_SIZE
+    )
+    async_engine = create_async_engine(
+        _async_url(Config.DATABASE_URL), echo=False, query_cache_size=QUERY_CACHE_SIZE
+    )
+    for _engine in (engine, async_engine.sync_engine):
+        event.listen(_engine, "connect", _set_sqlite_pragmas)
+else:
+    # Keep connections open across concurrent updates; LIFO reuses the
+    # warmest connection and lets idle overflow connections time out
+    engine_options = dict(
+        pool_size=Config.DB_POOL_SIZE,
+        max_overflow=Config.DB_MAX_OVERFLOW,
+        pool_timeout=Config.DB_POOL_TIMEOUT,
+        pool_recycle=Config.DB_POOL_RECYCLE,
+        pool_pre_ping=True,
+        pool_use_lifo=True,
+        query_cache_size=QUERY_CACHE_SIZE,
+    )
+    engine = create_engine(Config.DATABASE_URL, echo=False, **engine_options)
+    async_engine = create_async_engine(_async_url(Config.DATABASE_URL), echo=False, **engine_options)
+
+# Create session factories
+# Objects stay usable after commit without being reloaded
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+
+# INSERT constructs that support ON CONFLICT DO UPDATE
+INSERT_BY_DIALECT = {
+    "postgresql": pg_insert,
+    "sqlite": sqlite_insert,
+}
+
+
+def upsert(model, values: dict, index_elements: list, update_fields: dict):
+    """
+    Build INSERT ... ON CONFLICT (index_elements) DO UPDATE SET update_fields
+    Supported on PostgreSQL and SQLite (3.24+)
+    """
+    insert = INSERT_BY_DIALECT[engine.dialect.name]
+    return insert(model).values(**values).on_conflict_do_update(
+        index_elements=index_elements, set_=update_fields
+    )
+
+
+class utcnow(FunctionElement):
+    """
+    Current UTC time, evaluated by the database
+    Matches the naive UTC datetimes the models store (datetime.utcnow)
+    """
+    type = DateTime()
+    inherit_cache = True
+
+
+@compiles(utcnow, "postgresql")
+def _pg_utcnow(element, compiler, **kw):
+    return "TIMEZONE('utc', CURRENT_TIMESTAMP)"
+
+
+@compiles(utcnow)
+def _default_utcnow(element, compiler, **kw):
+    # SQLite's CURRENT_TIMESTAMP is already UTC
+    return "CURRENT_TIMESTAMP"
 
 
 def init_db():
     """Initialize database - create all tables"""
     Base.metadata.create_all(bind=engine)
-    print("Database initialized successfully")
+    logger.info("Database initialized")
 
 
 def get_db() -> Session:
@@ -36,3 +138,14 @@ def get_db() -> Session:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    """
+    Get async database session
+    Usage:
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(select(User).where(...))
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
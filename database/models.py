@@ -2,26 +2,68 @@
 Database models for AI Yoga Bot
 """
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, Float, JSON
+from enum import IntEnum
+from sqlalchemy import Column, Integer, SmallInteger, String, Date, DateTime, Boolean, Text, ForeignKey, Float, JSON, Index
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import declarative_base, relationship
+from sqlalchemy.types import TypeDecorator
 
 Base = declarative_base()
 
+# Binary, indexable JSONB on PostgreSQL; plain JSON elsewhere (SQLite)
+JSONType = JSON().with_variant(JSONB(), 'postgresql')
+
+
+class Experience(IntEnum):
+    """Yoga experience level"""
+    BEGINNER = 1
+    INTERMEDIATE = 2
+    ADVANCED = 3
+    
+    def __str__(self):
+        # Text form used in AI prompts: beginner, intermediate, advanced
+        return self.name.lower()
+
+
+class ReminderFrequency(IntEnum):
+    """How often practice reminders are sent"""
+    OFF = 0
+    DAILY = 1
+    EVERY_OTHER_DAY = 2
+    WEEKDAYS = 3
+    WEEKENDS = 4
+
+
+class IntEnumType(TypeDecorator):
+    """Store an IntEnum as SMALLINT and load it back as the enum member"""
+    impl = SmallInteger
+    cache_ok = True
+    
+    def __init__(self, enum_class, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.enum_class = enum_class
+    
+    def process_bind_param(self, value, dialect):
+        return None if value is None else int(value)
+    
+    def process_result_value(self, value, dialect):
+        return None if value is None else self.enum_class(int(value))
+
 
 class User(Base):
     """User model - stores user information and preferences"""
     __tablename__ = 'users'
     
     id = Column(Integer, primary_key=True)
-    telegram_id = Column(Integer, unique=True, nullable=False, index=True)
+    telegram_id = Column(Integer, nullable=False)
     username = Column(String(255))
     first_name = Column(String(255))
     last_name = Column(String(255))
     
     # Onboarding data
-    goals = Column(JSON)  # User's yoga goals
-    experience_level = Column(String(50))  # beginner, intermediate, advanced
-    health_conditions = Column(JSON)  # Any health limitations
+    goals = Column(JSONType)  # User's yoga goals
+    experience_level = Column(IntEnumType(Experience))
+    health_conditions = Column(JSONType)  # Any health limitations
     preferred_time = Column(String(10))  # Preferred practice time
     available_duration = Column(Integer)  # Available time in minutes
     
@@ -32,8 +74,10 @@ class User(Base):
     # Settings
     language = Column(String(5), default='uk')
     notifications_enabled = Column(Boolean, default=True)
-    reminder_time = Column(String(10))
-    reminder_frequency = Column(String(50), default='daily')
+    reminder_hour = Column(SmallInteger)  # Kyiv time, 0-23
+    reminder_minute = Column(SmallInteger)
+    reminder_frequency = Column(IntEnumType(ReminderFrequency), default=ReminderFrequency.DAILY)
+    reminder_anchor_date = Column(Date)  # Kyiv date the schedule was set; EVERY_OTHER_DAY counts from it
     
     # Metadata
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -41,9 +85,29 @@ class User(Base):
     is_active = Column(Boolean, default=True)
     
     # Relationships
-    practices = relationship("Practice", back_populates="user", cascade="all, delete-orphan")
-    progress = relationship("UserProgress", back_populates="user", cascade="all, delete-orphan")
-    current_module = relationship("Module", foreign_keys=[current_module_id])
+    # lazy="raise": load explicitly with selectinload/joinedload at the query
+    # site; an implicit per-row lazy load (N+1) fails loudly instead
+    practices = relationship("Practice", back_populates="user", cascade="all, delete-orphan", lazy="raise")
+    progress = relationship("UserProgress", back_populates="user", cascade="all, delete-orphan", lazy="raise")
+    current_module = relationship("Module", foreign_keys=[current_module_id], lazy="raise")
+    
+    __table_args__ = (
+        # Containment queries on health conditions (PostgreSQL only)
+        Index('ix_users_health_gin', health_conditions, postgresql_using='gin').ddl_if(dialect='postgresql'),
+        # The one unique index on telegram_id (upsert conflict target); on PostgreSQL
+        # it also covers telegram_id -> id (resolve_user_id) as an index-only scan.
+        # SQLite ignores INCLUDE: its indexes already carry the rowid, which is users.id
+        Index('ix_users_tg_covering', telegram_id, unique=True, postgresql_include=['id']),
+        # Per-minute reminder sweep: users due at a given time
+        Index('ix_users_reminder_time', reminder_hour, reminder_minute),
+    )
+    
+    @property
+    def reminder_time(self):
+        """Reminder time formatted as HH:MM, or None if not set"""
+        if self.reminder_hour is None:
+            return None
+        return f"{self.reminder_hour:02d}:{self.reminder_minute or 0:02d}"
     
     def __repr__(self):
         return f"<User(telegram_id={self.telegram_id}, name={self.first_name})>"
@@ -60,11 +124,11 @@ class Module(Base):
     order = Column(Integer)  # Module sequence
     
     # Module content metadata
-    topics = Column(JSON)  # List of topics covered
+    topics = Column(JSONType)  # List of topics covered
     duration_weeks = Column(Integer)  # Estimated duration
     
     # Requirements
-    prerequisites = Column(JSON)  # Required previous modules
+    prerequisites = Column(JSONType)  # Required previous modules
     
     created_at = Column(DateTime, default=datetime.utcnow)
     is_active = Column(Boolean, default=True)
@@ -87,14 +151,14 @@ class Practice(Base):
     difficulty = Column(String(50))
     
     # AI-generated content
-    practice_content = Column(JSON)  # AI-generated practice instructions
+    practice_content = Column(JSONType)  # AI-generated practice instructions
     personalization_notes = Column(Text)  # AI personalization reasoning
     
     # User feedback
     completed = Column(Boolean, default=False)
     rating = Column(Integer)  # 1-5 stars
     feedback = Column(Text)
-    challenges = Column(JSON)  # What was difficult
+    challenges = Column(JSONType)  # What was difficult
     
     # Metadata
     scheduled_at = Column(DateTime)
@@ -106,6 +170,14 @@ class Practice(Base):
     user = relationship("User", back_populates="practices")
     module = relationship("Module")
     
+    __table_args__ = (
+        # Serves progress pagination: completed practices of a user, newest first
+        Index('ix_practice_user_completed_date', user_id, completed, completed_at.desc()),
+        # Partial index for the "latest uncompleted practice" fallback
+        Index('ix_practice_user_incomplete', user_id, created_at.desc(),
+              postgresql_where=completed == False, sqlite_where=completed == False),
+    )
+    
     def __repr__(self):
         return f"<Practice(user_id={self.user_id}, type={self.practice_type}, completed={self.completed})>"
 
@@ -129,8 +201,8 @@ class UserProgress(Base):
     
     # Adaptation data
     adaptation_level = Column(String(50))  # How practices are adapted
-    strengths = Column(JSON)  # User's strengths
-    areas_to_improve = Column(JSON)  # Areas needing focus
+    strengths = Column(JSONType)  # User's strengths
+    areas_to_improve = Column(JSONType)  # Areas needing focus
     
     # Timestamps
     started_at = Column(DateTime)
@@ -141,5 +213,11 @@ class UserProgress(Base):
     user = relationship("User", back_populates="progress")
     module = relationship("Module")
     
+    __table_args__ = (
+        # One progress row per user and module
+        Index('ix_progress_user_module', user_id, module_id, unique=True),
+        Index('ix_progress_user_status', user_id, status),
+    )
+    
     def __repr__(self):
         return f"<UserProgress(user_id={self.user_id}, module_id={self.module_id}, status={self.status})>"
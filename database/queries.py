@@ -0,0 +1,19 @@
+"""
+Shared query helpers for hot lookups
+"""
+from typing import Optional
+from sqlalchemy.orm import Query, Session
+from .models import Practice
+
+
+def incomplete_practices(db: Session, user_id: int) -> Query:
+    """A user's uncompleted practices, newest first (served by ix_practice_user_incomplete)"""
+    return db.query(Practice).filter(
+        Practice.user_id == user_id,
+        Practice.completed == False
+    ).order_by(Practice.created_at.desc())
+
+
+def get_latest_incomplete_practice(db: Session, user_id: int) -> Optional[int]:
+    """Get the id of the user's latest uncompleted practice, fetching only the PK"""
+    return incomplete_practices(db, user_id).with_entities(Practice.id).limit(1).scalar()
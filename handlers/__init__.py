@@ -1,19 +1,31 @@
 """
 Bot handlers package
+Handler modules are imported on first attribute access (PEP 562)
 """
-from .start_handler import start_command, help_command, show_main_menu
-from .onboarding_handler import OnboardingHandler
-from .practice_handler import PracticeHandler
-from .profile_handler import ProfileHandler
-from .reminders_handler import RemindersHandler
+import importlib
 
-__all__ = [
-    'start_command',
-    'help_command',
-    'show_main_menu',
-    'OnboardingHandler',
-    'PracticeHandler',
-    'ProfileHandler',
-    'RemindersHandler'
-]
+# Public name -> (module, attribute)
+_LAZY = {
+    'start_command': ('.start_handler', 'start_command'),
+    'help_command': ('.start_handler', 'help_command'),
+    'show_main_menu': ('.start_handler', 'show_main_menu'),
+    'OnboardingHandler': ('.onboarding_handler', 'OnboardingHandler'),
+    'PracticeHandler': ('.practice_handler', 'PracticeHandler'),
+    'ProfileHandler': ('.profile_handler', 'ProfileHandler'),
+    'RemindersHandler': ('.reminders_handler', 'RemindersHandler'),
+}
 
+__all__ = list(_LAZY)
+
+
+def __getattr__(name):
+    if name in _LAZY:
+        module, attr = _LAZY[name]
+        obj = getattr(importlib.import_module(module, __name__), attr)
+        globals()[name] = obj
+        return obj
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,86 @@
+"""
+Reply keyboards shared by the handlers
+Built once at import and reused for every user
+"""
+from telegram import ReplyKeyboardMarkup
+
+# Main menu
+KB_MAIN = ReplyKeyboardMarkup([
+    ['Розпочати практику 🧘'],
+    ['Переглянути прогрес 📊', 'Мій профіль 👤'],
+    ['Налаштування ⚙️', 'Допомога 💡']
+], one_time_keyboard=False, resize_keyboard=True)
+# Main menu shown after reminder changes
+KB_MAIN_COMPACT = ReplyKeyboardMarkup([
+    ['Розпочати практику 🧘'],
+    ['Переглянути прогрес 📊', 'Мій профіль 👤'],
+    ['Допомога 💡']
+], one_time_keyboard=False, resize_keyboard=True)
+# Navigation under the progress report
+KB_PROGRESS_NAV = ReplyKeyboardMarkup([
+    ['Розпочати практику 🧘'],
+    ['Мій профіль 👤', 'Налаштування ⚙️'],
+    ['Допомога 💡', 'Назад 🔙']
+], one_time_keyboard=False, resize_keyboard=True)
+KB_SETTINGS = ReplyKeyboardMarkup([
+    ['Профіль 👤', 'Нагадування ⏰'],
+    ['Мова 🌐', 'Назад 🔙']
+], one_time_keyboard=True, resize_keyboard=True)
+
+# Onboarding and profile editing
+KB_EXPERIENCE = ReplyKeyboardMarkup([
+    ['Повний новачок 🌱'],
+    ['Трохи практикував(ла) 🌿'],
+    ['Є досвід 🌳']
+], one_time_keyboard=True, resize_keyboard=True)
+KB_DURATION = ReplyKeyboardMarkup([
+    ['10-15 хвилин'],
+    ['20-30 хвилин'],
+    ['45-60 хвилин']
+], one_time_keyboard=True, resize_keyboard=True)
+KB_REMINDER_FREQ = ReplyKeyboardMarkup([
+    ['Щодня', 'Через день'],
+    ['По буднях', 'По вихідних'],
+    ['Вимкнути нагадування ❌']
+], one_time_keyboard=True, resize_keyboard=True)
+KB_CONFIRM = ReplyKeyboardMarkup([
+    ['Так, почнімо! 🚀'],
+    ['Змінити налаштування ⚙️']
+], one_time_keyboard=True, resize_keyboard=True)
+KB_PROFILE_MENU = ReplyKeyboardMarkup([
+    ['Цілі 🎯', 'Рівень досвіду 📊'],
+    ['Здоров\'я 💊', 'Тривалість ⌛'],
+    ['Назад 🔙', 'Готово ✅']
+], one_time_keyboard=True, resize_keyboard=True)
+
+# Reminder settings
+KB_REMINDER_FREQ_BACK = ReplyKeyboardMarkup([
+    ['Щодня', 'Через день'],
+    ['По буднях', 'По вихідних'],
+    ['Вимкнути нагадування ❌'],
+    ['Назад 🔙']
+], one_time_keyboard=True, resize_keyboard=True)
+
+# Practice flow
+KB_PRACTICE_TYPE = ReplyKeyboardMarkup([
+    ['Асани (пози) 🧘'],
+    ['Пранаяма (дихання) 🌬️'],
+    ['Медитація 🧘‍♀️'],
+    ['Комплексна практика ✨'],
+    ['Назад 🔙']
+], one_time_keyboard=True, resize_keyboard=True)
+KB_PRACTICE_DONE = ReplyKeyboardMarkup([
+    ['Завершив(ла) практику ✅'],
+    ['Відкласти на потім ⏰']
+], one_time_keyboard=True, resize_keyboard=True)
+KB_POSTPONE = ReplyKeyboardMarkup([
+    ['Через 1 хвилину ⏱️', 'Через 30 хвилин ⏱️'],
+    ['Через 1 годину ⏰', 'Через 3 години ⏰']
+], one_time_keyboard=True, resize_keyboard=True)
+KB_RATING = ReplyKeyboardMarkup([
+    ['⭐', '⭐⭐', '⭐⭐⭐'],
+    ['⭐⭐⭐⭐', '⭐⭐⭐⭐⭐']
+], one_time_keyboard=True, resize_keyboard=True)
+KB_SKIP = ReplyKeyboardMarkup([
+    ['Пропустити ⏭️']
+], one_time_keyboard=True, resize_keyboard=True)
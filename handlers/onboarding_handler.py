@@ -2,11 +2,11 @@
 Onboarding conversation handler
 Guides new users through initial setup and personalization
 """
-from telegram import Update, ReplyKeyboardMarkup, ReplyKeyboardRemove
+from telegram import Update, ReplyKeyboardRemove
 from telegram.ext import ContextTypes, ConversationHandler
-from database import SessionLocal, User
-from ai import ClaudeClient
-from datetime import datetime
+from database import AsyncSessionLocal, User, Experience, ReminderFrequency, invalidate_user, upsert, utcnow
+from handlers.keyboards import KB_EXPERIENCE, KB_DURATION, KB_REMINDER_FREQ, KB_CONFIRM, KB_MAIN
+from handlers.reminders_handler import TIME_RE, FREQUENCY_BY_LABEL, FREQUENCY_LABELS, reminder_anchor_date
 import logging
 import json
 
@@ -15,12 +15,44 @@ logger = logging.getLogger(__name__)
 # Onboarding states
 O_GOALS, O_EXPERIENCE, O_HEALTH, O_DURATION, O_REMINDER_FREQ, O_REMINDER_TIME, O_CONFIRMATION = range(7)
 
+# Answer -> stored value maps
+EXPERIENCE_MAP = {
+    'Повний новачок 🌱': Experience.BEGINNER,
+    'Трохи практикував(ла) 🌿': Experience.INTERMEDIATE,
+    'Є досвід 🌳': Experience.ADVANCED
+}
+DURATION_MAP = {
+    '10-15 хвилин': 15,
+    '20-30 хвилин': 30,
+    '45-60 хвилин': 60
+}
+
+# Onboarding summary shown before confirmation
+SUMMARY_TMPL = (
+    "Чудово! Ось що я дізнався про тебе:\n\n"
+    "🎯 **Цілі:** {goals}\n"
+    "📊 **Рівень:** {level}\n"
+    "⌛ **Тривалість:** {duration} хвилин\n"
+    "⏰ **Нагадування:** {reminder}\n\n"
+    "Тепер я зможу створювати персоналізовані практики саме для тебе! 🙏\n\n"
+    "Готовий(а) розпочати свою першу практику?"
+)
+
+
+async def _save_user(telegram_id: int, fields: dict):
+    """Write onboarding answers in one statement, creating the user row if missing"""
+    stmt = upsert(User, dict(telegram_id=telegram_id, **fields), ['telegram_id'], fields)
+    async with AsyncSessionLocal() as db:
+        await db.execute(stmt)
+        await db.commit()
+
 
 class OnboardingHandler:
     """Handles user onboarding flow"""
     
-    def __init__(self):
-        self.ai_client = ClaudeClient()
+    def __init__(self, settings_command=None):
+        # Injected by bot.main() to avoid importing bot from handlers
+        self.settings_command = settings_command
     
     async def restart_onboarding(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Restart onboarding for existing users"""
@@ -47,28 +79,15 @@ class OnboardingHandler:
         context.user_data['goals'] = user_message
         
         # Ask about experience (No AI response here as requested)
-        keyboard = [
-            ['Повний новачок 🌱'],
-            ['Трохи практикував(ла) 🌿'],
-            ['Є досвід 🌳']
-        ]
-        reply_markup = ReplyKeyboardMarkup(keyboard, one_time_keyboard=True, resize_keyboard=True)
-        
         await update.message.reply_text(
             "Який у тебе досвід з йогою?",
-            reply_markup=reply_markup
+            reply_markup=KB_EXPERIENCE
         )
         return O_EXPERIENCE
     
     async def collect_experience(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Collect experience level"""
-        experience_map = {
-            'Повний новачок 🌱': 'beginner',
-            'Трохи практикував(ла) 🌿': 'intermediate',
-            'Є досвід 🌳': 'advanced'
-        }
-        
-        experience = experience_map.get(update.message.text, 'beginner')
+        experience = EXPERIENCE_MAP.get(update.message.text, Experience.BEGINNER)
         context.user_data['experience_level'] = experience
         
         await update.message.reply_text(
@@ -90,41 +109,21 @@ class OnboardingHandler:
             context.user_data['health_conditions'] = []
         
         # Ask about available duration
-        keyboard = [
-            ['10-15 хвилин'],
-            ['20-30 хвилин'],
-            ['45-60 хвилин']
-        ]
-        reply_markup = ReplyKeyboardMarkup(keyboard, one_time_keyboard=True, resize_keyboard=True)
-        
         await update.message.reply_text(
             "Скільки часу ти готовий(а) приділяти практиці?",
-            reply_markup=reply_markup
+            reply_markup=KB_DURATION
         )
         return O_DURATION
 
     async def collect_duration(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Collect available duration"""
-        duration_map = {
-            '10-15 хвилин': 15,
-            '20-30 хвилин': 30,
-            '45-60 хвилин': 60
-        }
-        
-        duration = duration_map.get(update.message.text, 15)
+        duration = DURATION_MAP.get(update.message.text, 15)
         context.user_data['available_duration'] = duration
         
         # Ask about reminder frequency
-        keyboard = [
-            ['Щодня', 'Через день'],
-            ['По буднях', 'По вихідних'],
-            ['Вимкнути нагадування ❌']
-        ]
-        reply_markup = ReplyKeyboardMarkup(keyboard, one_time_keyboard=True, resize_keyboard=True)
-        
         await update.message.reply_text(
             "Як часто ти хочеш отримувати нагадування про практику? 🧘‍♂️",
-            reply_markup=reply_markup
+            reply_markup=KB_REMINDER_FREQ
         )
         return O_REMINDER_FREQ
 
@@ -134,12 +133,13 @@ class OnboardingHandler:
         
         if choice == 'Вимкнути нагадування ❌':
             context.user_data['notifications_enabled'] = False
-            context.user_data['reminder_frequency'] = 'off'
-            context.user_data['reminder_time'] = None
+            context.user_data['reminder_frequency'] = ReminderFrequency.OFF
+            context.user_data['reminder_hour'] = None
+            context.user_data['reminder_minute'] = None
             return await self.show_onboarding_summary(update, context)
 
         context.user_data['notifications_enabled'] = True
-        context.user_data['reminder_frequency'] = choice
+        context.user_data['reminder_frequency'] = FREQUENCY_BY_LABEL.get(choice, ReminderFrequency.DAILY)
         
         await update.message.reply_text(
             "Введи час нагадування у форматі ГГ:ХХ (наприклад, 08:30 або 09:00):",
@@ -149,51 +149,34 @@ class OnboardingHandler:
 
     async def collect_reminder_time(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle reminder time input"""
-        time_text = update.message.text
-        
-        try:
-            # Validate time format
-            hour, minute = map(int, time_text.split(':'))
-            if not (0 <= hour <= 23 and 0 <= minute <= 59):
-                raise ValueError
-            
-            context.user_data['reminder_time'] = f"{hour:02d}:{minute:02d}"
-            return await self.show_onboarding_summary(update, context)
-            
-        except ValueError:
+        match = TIME_RE.match(update.message.text.strip())
+        if not match:
             await update.message.reply_text(
                 "Будь ласка, введи час у правильному форматі ГГ:ХХ (наприклад, 08:30):"
             )
             return O_REMINDER_TIME
+        
+        context.user_data['reminder_hour'] = int(match.group(1))
+        context.user_data['reminder_minute'] = int(match.group(2))
+        return await self.show_onboarding_summary(update, context)
 
     async def show_onboarding_summary(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Show summary and confirm"""
         duration = context.user_data.get('available_duration', 15)
-        freq = context.user_data.get('reminder_frequency', 'off')
-        rem_time = context.user_data.get('reminder_time', '-')
+        freq = context.user_data.get('reminder_frequency', ReminderFrequency.OFF)
+        hour = context.user_data.get('reminder_hour')
+        rem_time = f"{hour:02d}:{context.user_data['reminder_minute']:02d}" if hour is not None else '-'
         
-        reminder_info = f"{freq} о {rem_time}" if freq != 'off' else "Вимкнено"
+        reminder_info = f"{FREQUENCY_LABELS.get(freq, freq)} о {rem_time}" if freq != ReminderFrequency.OFF else "Вимкнено"
         
-        summary = f"""
-Чудово! Ось що я дізнався про тебе:
-
-🎯 **Цілі:** {context.user_data.get('goals', 'N/A')}
-📊 **Рівень:** {context.user_data.get('experience_level', 'N/A')}
-⌛ **Тривалість:** {duration} хвилин
-⏰ **Нагадування:** {reminder_info}
-
-Тепер я зможу створювати персоналізовані практики саме для тебе! 🙏
-
-Готовий(а) розпочати свою першу практику?
-"""
-        
-        keyboard = [
-            ['Так, почнімо! 🚀'],
-            ['Змінити налаштування ⚙️']
-        ]
-        reply_markup = ReplyKeyboardMarkup(keyboard, one_time_keyboard=True, resize_keyboard=True)
+        summary = SUMMARY_TMPL.format(
+            goals=context.user_data.get('goals', 'N/A'),
+            level=context.user_data.get('experience_level', 'N/A'),
+            duration=duration,
+            reminder=reminder_info
+        )
         
-        await update.message.reply_text(summary, reply_markup=reply_markup, parse_mode='Markdown')
+        await update.message.reply_text(summary, reply_markup=KB_CONFIRM, parse_mode='Markdown')
         return O_CONFIRMATION
     
     async def finish_onboarding(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -201,54 +184,33 @@ class OnboardingHandler:
         user = update.effective_user
         
         if update.message.text == 'Змінити налаштування ⚙️':
-            from bot import settings_command
-            await settings_command(update, context)
+            await self.settings_command(update, context)
             return ConversationHandler.END
         
-        # Save user data to database
-        with SessionLocal() as db:
-            db_user = db.query(User).filter(User.telegram_id == user.id).first()
-            
-            if db_user:
-                db_user.goals = context.user_data.get('goals', '')
-                db_user.experience_level = context.user_data.get('experience_level', 'beginner')
-                db_user.health_conditions = context.user_data.get('health_conditions', [])
-                db_user.available_duration = context.user_data.get('available_duration', 15)
-                db_user.reminder_frequency = context.user_data.get('reminder_frequency', 'off')
-                db_user.reminder_time = context.user_data.get('reminder_time')
-                db_user.notifications_enabled = context.user_data.get('notifications_enabled', True)
-                db_user.current_state = 'active'
-                db_user.last_active = datetime.utcnow()
-                
-                db.commit()
-                
-                # Schedule reminder if enabled
-                if db_user.notifications_enabled and db_user.reminder_time:
-                    try:
-                        from handlers.reminders_handler import RemindersHandler
-                        rem_handler = RemindersHandler()
-                        hour, minute = map(int, db_user.reminder_time.split(':'))
-                        rem_handler.schedule_user_reminder(
-                            context.application if hasattr(context, 'application') else context, 
-                            user.id, hour, minute, db_user.reminder_frequency
-                        )
-                    except Exception as e:
-                        logger.error(f"Failed to schedule reminder during onboarding: {e}")
-                
-                logger.info(f"User {user.id} completed onboarding")
-        
-        keyboard = [
-            ['Розпочати практику 🧘'],
-            ['Переглянути прогрес 📊', 'Мій профіль 👤'],
-            ['Налаштування ⚙️', 'Допомога 💡']
-        ]
-        reply_markup = ReplyKeyboardMarkup(keyboard, one_time_keyboard=False, resize_keyboard=True)
+        # Save user data to database in a single upsert
+        fields = {
+            'goals': context.user_data.get('goals', ''),
+            'experience_level': context.user_data.get('experience_level', Experience.BEGINNER),
+            'health_conditions': context.user_data.get('health_conditions', []),
+            'available_duration': context.user_data.get('available_duration', 15),
+            'reminder_frequency': context.user_data.get('reminder_frequency', ReminderFrequency.OFF),
+            'reminder_hour': context.user_data.get('reminder_hour'),
+            'reminder_minute': context.user_data.get('reminder_minute'),
+            'reminder_anchor_date': reminder_anchor_date(),
+            'notifications_enabled': context.user_data.get('notifications_enabled', True),
+            'current_state': 'active',
+            'last_active': utcnow(),
+        }
+        await _save_user(user.id, fields)
+        # The reminder sweeper picks up the saved reminder settings
+        invalidate_user(user.id)
+        logger.info("User %s completed onboarding", user.id)
         
         await update.message.reply_text(
             "Вітаю! Ти готовий(а) до практики! 🎉\n\n"
             "Використовуй /practice щоб розпочати свою першу практику.\n\n"
             "Намасте! 🙏",
-            reply_markup=reply_markup
+            reply_markup=KB_MAIN
         )
         
         return ConversationHandler.END
@@ -2,233 +2,270 @@
 Practice session handlers
 Manages practice creation, execution, and feedback
 """
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, ReplyKeyboardMarkup, ReplyKeyboardRemove
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
-from database import SessionLocal, User, Practice
-from ai import ClaudeClient
+from database import (
+    SessionLocal, Practice, get_user_by_telegram_async, resolve_user_id,
+    get_latest_incomplete_practice
+)
+from ai import get_claude_client
+from openai import APITimeoutError
+from handlers.keyboards import (
+    KB_MAIN, KB_PRACTICE_TYPE, KB_PRACTICE_DONE, KB_POSTPONE, KB_RATING, KB_SKIP
+)
 from datetime import datetime, timedelta
+from typing import Optional
+import asyncio
+import json
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Answer -> stored value maps
+PRACTICE_TYPE_MAP = {
+    'Асани (пози) 🧘': 'asana',
+    'Пранаяма (дихання) 🌬️': 'pranayama',
+    'Медитація 🧘‍♀️': 'meditation',
+    'Комплексна практика ✨': 'complex'
+}
+RATING_MAP = {
+    '⭐': 1,
+    '⭐⭐': 2,
+    '⭐⭐⭐': 3,
+    '⭐⭐⭐⭐': 4,
+    '⭐⭐⭐⭐⭐': 5
+}
+# Postpone button -> (minutes, label for the confirmation message)
+POSTPONE_MAP = {
+    'Через 1 хвилину ⏱️': (1, "1 хв"),
+    'Через 30 хвилин ⏱️': (30, "30 хв"),
+    'Через 1 годину ⏰': (60, "1 год"),
+    'Через 3 години ⏰': (180, "3 год"),
+}
+# Used when the reply is not one of the buttons
+DEFAULT_POSTPONE = (60, "1 год")
+
+# Markdown headers of practice messages
+NEW_PRACTICE_HEADER = "🧘 **Твоя персоналізована практика**\n\n"
+SAVED_PRACTICE_HEADER = "🧘 **Твоя збережена практика**\n\n"
+
+
+def _practice_text(practice_content, default: str) -> str:
+    """Text of a practice; non-string content is sent as JSON, never as a Python repr"""
+    content = practice_content.get('content') if isinstance(practice_content, dict) else None
+    if content is None:
+        return default
+    if not isinstance(content, str):
+        content = json.dumps(content, ensure_ascii=False)
+    return content
+
+
+def _create_practice(user_id: int, practice_type: str, duration: int, practice_content: dict) -> int:
+    """Insert a freshly generated practice and return its id. Blocking: run in a thread."""
+    with SessionLocal() as db:
+        new_practice = Practice(
+            user_id=user_id,
+            practice_type=practice_type,
+            duration=duration,
+            practice_content=practice_content,
+            scheduled_at=datetime.utcnow(),
+            started_at=datetime.utcnow()
+        )
+        db.add(new_practice)
+        db.commit()
+        return new_practice.id
+
+
+def _find_incomplete_practice(telegram_id: int) -> Optional[int]:
+    """Id of the user's latest uncompleted practice. Blocking: run in a thread."""
+    with SessionLocal() as db:
+        user_id = resolve_user_id(db, telegram_id)
+        return get_latest_incomplete_practice(db, user_id) if user_id else None
+
+
+def _load_practice_content(practice_id: int) -> Optional[dict]:
+    """Stored content of a practice. Blocking: run in a thread."""
+    with SessionLocal() as db:
+        return db.query(Practice.practice_content).filter(Practice.id == practice_id).scalar()
+
+
+def _save_rating(telegram_id: int, practice_id: Optional[int], rating: int) -> Optional[int]:
+    """
+    Store a rating on the given practice, or on the user's latest
+    uncompleted one when the id was lost. Blocking: run in a thread.
+    
+    Returns:
+        Id of the rated practice, if any
+    """
+    with SessionLocal() as db:
+        if not practice_id:
+            user_id = resolve_user_id(db, telegram_id)
+            practice_id = get_latest_incomplete_practice(db, user_id) if user_id else None
+            if not practice_id:
+                return None
+        db.query(Practice).filter(Practice.id == practice_id).update(
+            {'rating': rating}, synchronize_session=False
+        )
+        db.commit()
+        return practice_id
+
+
+def _finish_practice(practice_id: int, thoughts: Optional[str]):
+    """
+    Mark a practice completed with the user's thoughts,
+    in a single UPDATE and commit. Blocking: run in a thread.
+    """
+    values = {
+        'completed': True,
+        'completed_at': datetime.utcnow(),
+        'feedback': thoughts, # Store user thoughts in feedback field
+    }
+    with SessionLocal() as db:
+        db.query(Practice).filter(Practice.id == practice_id).update(values, synchronize_session=False)
+        db.commit()
+
 
 class PracticeHandler:
     """Handles practice-related functionality"""
     
     def __init__(self):
-        self.ai_client = ClaudeClient()
+        self.ai_client = get_claude_client()
     
     async def start_practice(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Start a new practice session"""
-        user = update.effective_user
+        db_user = await get_user_by_telegram_async(update.effective_user.id)
         
-        with SessionLocal() as db:
-            db_user = db.query(User).filter(User.telegram_id == user.id).first()
-            
-            if not db_user:
-                await update.message.reply_text(
-                    "Спочатку потрібно пройти онбординг. Використай /start"
-                )
-                return
-            
-            # Check if user completed onboarding
-            if not (db_user.goals and db_user.experience_level and db_user.available_duration):
-                await update.message.reply_text(
-                    "Спочатку давай завершимо знайомство! Використай /start"
-                )
-                return
-            
-            # Show practice type selection
-            keyboard = [
-                ['Асани (пози) 🧘'],
-                ['Пранаяма (дихання) 🌬️'],
-                ['Медитація 🧘‍♀️'],
-                ['Комплексна практика ✨'],
-                ['Назад 🔙']
-            ]
-            reply_markup = ReplyKeyboardMarkup(keyboard, one_time_keyboard=True, resize_keyboard=True)
-            
+        if not db_user:
             await update.message.reply_text(
-                "Який тип практики тебе цікавить сьогодні?",
-                reply_markup=reply_markup
+                "Спочатку потрібно пройти онбординг. Використай /start"
             )
-            
-            context.user_data['practice_flow'] = 'type_selection'
+            return
+        
+        # Check if user completed onboarding
+        if not (db_user.goals and db_user.experience_level and db_user.available_duration):
+            await update.message.reply_text(
+                "Спочатку давай завершимо знайомство! Використай /start"
+            )
+            return
+        
+        # Show practice type selection
+        await update.message.reply_text(
+            "Який тип практики тебе цікавить сьогодні?",
+            reply_markup=KB_PRACTICE_TYPE
+        )
+        
+        context.user_data['practice_flow'] = 'type_selection'
     
     async def handle_practice_type(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle practice type selection"""
-        type_map = {
-            'Асани (пози) 🧘': 'asana',
-            'Пранаяма (дихання) 🌬️': 'pranayama',
-            'Медитація 🧘‍♀️': 'meditation',
-            'Комплексна практика ✨': 'complex'
-        }
-        
-        if update.message.text not in type_map:
+        if update.message.text not in PRACTICE_TYPE_MAP:
             # If it's not a valid type, skip processing.
             # We'll handle menu buttons in the main router.
-            logger.info(f"Skipping practice generation for message: {update.message.text}")
+            logger.info("Skipping practice generation for message: %s", update.message.text)
             return
             
-        practice_type = type_map[update.message.text]
+        practice_type = PRACTICE_TYPE_MAP[update.message.text]
         context.user_data['practice_type'] = practice_type
         
         # Clear flow so subsequent buttons work correctly
         context.user_data.pop('practice_flow', None)
         
         user = update.effective_user
+        db_user = await get_user_by_telegram_async(user.id)
         
-        # Generate practice using AI
-        await update.message.reply_text(
-            "Створюю персоналізовану практику для тебе... ⏳"
-        )
+        # Prepare user data for AI
+        user_data = {
+            'experience_level': db_user.experience_level,
+            'goals': db_user.goals,
+            'health_conditions': db_user.health_conditions or [],
+            'available_duration': db_user.available_duration
+        }
         
-        # Define main menu keyboard for error cases
-        main_menu_keyboard = [
-            ['Розпочати практику 🧘'],
-            ['Переглянути прогрес 📊', 'Мій профіль 👤'],
-            ['Налаштування ⚙️', 'Допомога 💡']
-        ]
-        error_reply_markup = ReplyKeyboardMarkup(main_menu_keyboard, one_time_keyboard=False, resize_keyboard=True)
-
-        with SessionLocal() as db:
-            db_user = db.query(User).filter(User.telegram_id == user.id).first()
+        # Start generating with AI before the "working on it" message,
+        # so the Telegram round trip overlaps the model call
+        practice_task = asyncio.create_task(self.ai_client.generate_practice(
+            user_data=user_data,
+            practice_type=practice_type,
+            duration=db_user.available_duration
+        ))
+        try:
+            await update.message.reply_text(
+                "Створюю персоналізовану практику для тебе... ⏳"
+            )
+        except Exception:
+            practice_task.cancel()
+            raise
+        
+        # Generate practice
+        try:
+            practice_content = await practice_task
+            
+            # Create practice record and store its ID for later
+            context.user_data['current_practice_id'] = await asyncio.to_thread(
+                _create_practice, db_user.id, practice_type, db_user.available_duration, practice_content
+            )
+            
+            # Send practice to user
+            practice_text = _practice_text(practice_content, 'Помилка генерації практики')
+            
+            await update.message.reply_text(
+                NEW_PRACTICE_HEADER + practice_text,
+                parse_mode='Markdown'
+            )
             
-            # Prepare user data for AI
-            user_data = {
-                'experience_level': db_user.experience_level,
-                'goals': db_user.goals,
-                'health_conditions': db_user.health_conditions or [],
-                'available_duration': db_user.available_duration
-            }
+            # Ask for feedback after practice
+            await update.message.reply_text(
+                "Коли завершиш практику, дай мені знати!",
+                reply_markup=KB_PRACTICE_DONE
+            )
             
-            # Generate practice
-            try:
-                import asyncio
-                # Set a timeout for AI generation (e.g., 60 seconds)
-                practice_content = await asyncio.wait_for(
-                    self.ai_client.generate_practice(
-                        user_data=user_data,
-                        practice_type=practice_type,
-                        duration=db_user.available_duration
-                    ),
-                    timeout=120.0
-                )
-                
-                # Create practice record
-                new_practice = Practice(
-                    user_id=db_user.id,
-                    practice_type=practice_type,
-                    duration=db_user.available_duration,
-                    practice_content=practice_content,
-                    scheduled_at=datetime.utcnow(),
-                    started_at=datetime.utcnow()
-                )
-                db.add(new_practice)
-                db.commit()
-                
-                # Store practice ID for later
-                context.user_data['current_practice_id'] = new_practice.id
-                
-                # Send practice to user
-                practice_text = practice_content.get('content', 'Помилка генерації практики')
-                
-                await update.message.reply_text(
-                    f"🧘 **Твоя персоналізована практика**\n\n{practice_text}",
-                    parse_mode='Markdown'
-                )
-                
-                # Ask for feedback after practice
-                keyboard = [
-                    ['Завершив(ла) практику ✅'],
-                    ['Відкласти на потім ⏰']
-                ]
-                reply_markup = ReplyKeyboardMarkup(keyboard, one_time_keyboard=True, resize_keyboard=True)
-                
-                await update.message.reply_text(
-                    "Коли завершиш практику, дай мені знати!",
-                    reply_markup=reply_markup
-                )
-                
-            except asyncio.TimeoutError:
-                logger.error("Timeout generating practice")
-                await update.message.reply_text(
-                    "Вибач, створення практики займає більше часу, ніж зазвичай. Спробуй ще раз пізніше або обери інший тип практики. ⏳",
-                    reply_markup=error_reply_markup
-                )
-            except Exception as e:
-                logger.error(f"Error generating practice: {e}", exc_info=True)
-                await update.message.reply_text(
-                    "Вибач, виникла помилка при створенні практики. Спробуй ще раз пізніше.",
-                    reply_markup=error_reply_markup
-                )
+        except APITimeoutError:
+            logger.error("Timeout generating practice")
+            await update.message.reply_text(
+                "Вибач, створення практики займає більше часу, ніж зазвичай. Спробуй ще раз пізніше або обери інший тип практики. ⏳",
+                reply_markup=KB_MAIN
+            )
+        except Exception as e:
+            logger.error("Error generating practice: %s", e, exc_info=True)
+            await update.message.reply_text(
+                "Вибач, виникла помилка при створенні практики. Спробуй ще раз пізніше.",
+                reply_markup=KB_MAIN
+            )
     
     async def complete_practice(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle practice completion - Step 1: Ask for rating"""
         if update.message.text == 'Відкласти на потім ⏰':
-            keyboard = [
-                ['Через 1 хвилину ⏱️', 'Через 30 хвилин ⏱️'],
-                ['Через 1 годину ⏰', 'Через 3 години ⏰']
-            ]
-            reply_markup = ReplyKeyboardMarkup(keyboard, one_time_keyboard=True, resize_keyboard=True)
             await update.message.reply_text(
                 "Добре, практику збережено. Коли тобі нагадати? 🙏",
-                reply_markup=reply_markup
+                reply_markup=KB_POSTPONE
             )
             context.user_data['practice_flow'] = 'reminder_setting'
             return
         
         practice_id = context.user_data.get('current_practice_id')
         
-        with SessionLocal() as db:
-            user = update.effective_user
-            db_user = db.query(User).filter(User.telegram_id == user.id).first()
-            
-            if not practice_id and db_user:
-                # Fallback: find latest uncompleted practice
-                practice = db.query(Practice).filter(
-                    Practice.user_id == db_user.id,
-                    Practice.completed == False
-                ).order_by(Practice.created_at.desc()).first()
-                if practice:
-                    practice_id = practice.id
-                    context.user_data['current_practice_id'] = practice_id
-            
-            if not practice_id:
-                await update.message.reply_text("Практика не знайдена. Спробуй створити нову за допомогою /practice")
-                return
+        if not practice_id:
+            # Fallback: find latest uncompleted practice
+            practice_id = await asyncio.to_thread(_find_incomplete_practice, update.effective_user.id)
+            if practice_id:
+                context.user_data['current_practice_id'] = practice_id
+        
+        if not practice_id:
+            await update.message.reply_text("Практика не знайдена. Спробуй створити нову за допомогою /practice")
+            return
 
         # Ask for rating immediately
-        keyboard = [
-            ['⭐', '⭐⭐', '⭐⭐⭐'],
-            ['⭐⭐⭐⭐', '⭐⭐⭐⭐⭐']
-        ]
-        reply_markup = ReplyKeyboardMarkup(keyboard, one_time_keyboard=True, resize_keyboard=True)
-        
         await update.message.reply_text(
             "Дякую за старанність! 🙏\nЯк ти почуваєшся після цієї практики?",
-            reply_markup=reply_markup
+            reply_markup=KB_RATING
         )
         
         context.user_data['practice_flow'] = 'rating'
 
     async def handle_reminder(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle reminder setting"""
-        choice = update.message.text
+        minutes, time_str = POSTPONE_MAP.get(update.message.text, DEFAULT_POSTPONE)
         
-        minutes = 0
-        if "1 хвилину" in choice:
-            minutes = 1
-        elif "30 хвилин" in choice:
-            minutes = 30
-        elif "1 годину" in choice:
-            minutes = 60
-        elif "3 години" in choice:
-            minutes = 180
-        else:
-            # Fallback
-            minutes = 60
-            
         practice_id = context.user_data.get('current_practice_id')
         
         # Schedule reminder
@@ -240,7 +277,7 @@ class PracticeHandler:
             for job in current_jobs:
                 job.schedule_removal()
             
-            logger.info(f"Scheduling postponed reminder for user {update.effective_user.id} in {minutes} minutes")
+            logger.info("Scheduling postponed reminder for user %s in %d minutes", update.effective_user.id, minutes)
             
             # Store practice_id in job data
             context.job_queue.run_once(
@@ -252,17 +289,9 @@ class PracticeHandler:
                 data={'practice_id': practice_id}
             )
             
-            keyboard = [
-                ['Розпочати практику 🧘'],
-                ['Переглянути прогрес 📊', 'Мій профіль 👤'],
-                ['Налаштування ⚙️', 'Допомога 💡']
-            ]
-            reply_markup = ReplyKeyboardMarkup(keyboard, one_time_keyboard=False, resize_keyboard=True)
-            
-            time_str = f"{minutes} хв" if minutes < 60 else f"{minutes//60} год"
             await update.message.reply_text(
                 f"Записав! Нагадаю тобі про практику через {time_str}. 🧘‍♂️",
-                reply_markup=reply_markup
+                reply_markup=KB_MAIN
             )
         else:
             logger.error("JobQueue not available in context")
@@ -275,7 +304,7 @@ class PracticeHandler:
         job = context.job
         practice_id = job.data.get('practice_id') if job.data else None
         
-        logger.info(f"Triggering postponed reminder for chat {job.chat_id}, practice_id: {practice_id}")
+        logger.info("Triggering postponed reminder for chat %s, practice_id: %s", job.chat_id, practice_id)
         
         keyboard = []
         if practice_id:
@@ -290,7 +319,7 @@ class PracticeHandler:
                 reply_markup=reply_markup
             )
         except Exception as e:
-            logger.error(f"Error sending postponed reminder: {e}")
+            logger.error("Error sending postponed reminder: %s", e)
 
     async def handle_continue_practice(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle 'Continue Practice' callback"""
@@ -299,63 +328,47 @@ class PracticeHandler:
         
         practice_id = int(query.data.split('_')[2])
         
-        with SessionLocal() as db:
-            practice = db.query(Practice).filter(Practice.id == practice_id).first()
-            if not practice:
-                await query.edit_message_text("На жаль, практику не знайдено. 😥")
-                return
-                
-            practice_text = practice.practice_content.get('content', 'Помилка завантаження')
-            
-            await context.bot.send_message(
-                chat_id=update.effective_chat.id,
-                text=f"🧘 **Твоя збережена практика**\n\n{practice_text}",
-                parse_mode='Markdown'
-            )
-            
-            # Show completion buttons
-            keyboard = [
-                ['Завершив(ла) практику ✅'],
-                ['Відкласти на потім ⏰']
-            ]
-            reply_markup = ReplyKeyboardMarkup(keyboard, one_time_keyboard=True, resize_keyboard=True)
-            
-            await context.bot.send_message(
-                chat_id=update.effective_chat.id,
-                text="Коли завершиш практику, дай мені знати!",
-                reply_markup=reply_markup
-            )
+        practice_content = await asyncio.to_thread(_load_practice_content, practice_id)
+        if practice_content is None:
+            await query.edit_message_text("На жаль, практику не знайдено. 😥")
+            return
             
-            context.user_data['current_practice_id'] = practice_id
-            context.user_data.pop('practice_flow', None)
-    
-    async def handle_rating(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """Handle practice rating and ask for thoughts"""
-        rating_map = {
-            '⭐': 1,
-            '⭐⭐': 2,
-            '⭐⭐⭐': 3,
-            '⭐⭐⭐⭐': 4,
-            '⭐⭐⭐⭐⭐': 5
-        }
+        practice_text = _practice_text(practice_content, 'Помилка завантаження')
         
-        rating = rating_map.get(update.message.text, 3)
-        practice_id = context.user_data.get('current_practice_id')
+        await context.bot.send_message(
+            chat_id=update.effective_chat.id,
+            text=SAVED_PRACTICE_HEADER + practice_text,
+            parse_mode='Markdown'
+        )
         
-        with SessionLocal() as db:
-            practice = db.query(Practice).filter(Practice.id == practice_id).first() if practice_id else None
-            
-            if practice:
-                practice.rating = rating
-                db.commit()
+        # Show completion buttons
+        await context.bot.send_message(
+            chat_id=update.effective_chat.id,
+            text="Коли завершиш практику, дай мені знати!",
+            reply_markup=KB_PRACTICE_DONE
+        )
         
-        keyboard = [['Пропустити ⏭️']]
-        reply_markup = ReplyKeyboardMarkup(keyboard, one_time_keyboard=True, resize_keyboard=True)
+        context.user_data['current_practice_id'] = practice_id
+        context.user_data.pop('practice_flow', None)
+    
+    async def handle_rating(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle practice rating and ask for thoughts"""
+        rating = RATING_MAP.get(update.message.text, 3)
         
-        await update.message.reply_text(
-            "Дякую за оцінку! 🌟\n\nТепер запиши свої думки, інсайти або відчуття, які прийшли до тебе під час практики. Це допоможе тобі відстежувати свій стан у майбутньому. 📝",
-            reply_markup=reply_markup
+        # Saved right away (the user may leave the flow before the thoughts
+        # step), in a thread while the reply is sent
+        practice_id, _ = await asyncio.gather(
+            asyncio.to_thread(
+                _save_rating, update.effective_user.id,
+                context.user_data.get('current_practice_id'), rating
+            ),
+            update.message.reply_text(
+                "Дякую за оцінку! 🌟\n\nТепер запиши свої думки, інсайти або відчуття, які прийшли до тебе під час практики. Це допоможе тобі відстежувати свій стан у майбутньому. 📝",
+                reply_markup=KB_SKIP
+            )
         )
+        if practice_id:
+            context.user_data['current_practice_id'] = practice_id
         
         context.user_data['practice_flow'] = 'thoughts'
 
@@ -367,26 +380,13 @@ class PracticeHandler:
             
         practice_id = context.user_data.get('current_practice_id')
         
-        with SessionLocal() as db:
-            practice = db.query(Practice).filter(Practice.id == practice_id).first() if practice_id else None
-            
-            if practice:
-                practice.completed = True
-                practice.completed_at = datetime.utcnow()
-                practice.feedback = thoughts # Store user thoughts in feedback field
-                db.commit()
-        
-        keyboard = [
-            ['Розпочати практику 🧘'],
-            ['Переглянути прогрес 📊', 'Мій профіль 👤'],
-            ['Налаштування ⚙️', 'Допомога 💡']
-        ]
-        reply_markup = ReplyKeyboardMarkup(keyboard, one_time_keyboard=False, resize_keyboard=True)
+        if practice_id:
+            await asyncio.to_thread(_finish_practice, practice_id, thoughts)
         
         await update.message.reply_text(
             "Чудово! Твою практику та відчуття збережено. ✅\n\n"
             "Продовжуй практикувати регулярно. Намасте! 🙏",
-            reply_markup=reply_markup
+            reply_markup=KB_MAIN
         )
         
         # Clear practice flow
@@ -2,10 +2,14 @@
 Profile management handler
 Allows users to view and edit their profile
 """
-from telegram import Update, ReplyKeyboardMarkup, ReplyKeyboardRemove
+from telegram import Update, ReplyKeyboardRemove
 from telegram.ext import ContextTypes, ConversationHandler
-from database import SessionLocal, User
-from datetime import datetime
+from sqlalchemy import Row, update
+from database import SessionLocal, User, Experience, get_user_by_telegram_async, invalidate_user, utcnow
+from handlers.keyboards import KB_MAIN, KB_PROFILE_MENU, KB_EXPERIENCE, KB_DURATION
+from handlers.onboarding_handler import EXPERIENCE_MAP, DURATION_MAP
+from typing import Optional
+import asyncio
 import logging
 
 logger = logging.getLogger(__name__)
@@ -13,81 +17,90 @@ logger = logging.getLogger(__name__)
 # Profile states
 PROFILE_MENU, EDIT_GOALS, EDIT_EXPERIENCE, EDIT_HEALTH, EDIT_DURATION = range(5)
 
+# Stored value -> label shown in the profile card
+EXPERIENCE_LABELS = {
+    Experience.BEGINNER: 'Повний новачок 🌱',
+    Experience.INTERMEDIATE: 'Трохи практикував(ла) 🌿',
+    Experience.ADVANCED: 'Є досвід 🌳'
+}
 
-class ProfileHandler:
-    """Handles user profile viewing and editing"""
-    
-    async def show_profile(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """Show user profile with edit options"""
-        user = update.effective_user
-        
-        with SessionLocal() as db:
-            db_user = db.query(User).filter(User.telegram_id == user.id).first()
-            
-            if not db_user:
-                await update.message.reply_text(
-                    "Спочатку потрібно пройти онбординг. Використай /start"
-                )
-                return ConversationHandler.END
-            
-            # Format profile info
-            experience_map = {
-                'beginner': 'Повний новачок 🌱',
-                'intermediate': 'Трохи практикував(ла) 🌿',
-                'advanced': 'Є досвід 🌳'
-            }
-            
-            time_map = {
-                'morning': 'Ранок 🌅',
-                'day': 'День ☀️',
-                'evening': 'Вечір 🌙'
-            }
-            
-            health_info = ', '.join(db_user.health_conditions) if db_user.health_conditions else 'Немає'
-            
-            profile_text = f"""
-👤 **Твій профіль**
+# Columns rendered in the profile card
+PROFILE_COLUMNS = (User.goals, User.experience_level, User.health_conditions, User.available_duration)
 
-🎯 **Цілі:** {db_user.goals or 'Не вказано'}
+# Profile card, filled per render
+PROFILE_TEMPLATE = (
+    "\n👤 **Твій профіль**\n\n"
+    "🎯 **Цілі:** {goals}\n\n"
+    "📊 **Рівень досвіду:** {level}\n\n"
+    "💊 **Особливості здоров'я:** {health}\n\n"
+    "⌛ **Тривалість практики:** {duration} хвилин\n\n"
+    "Що хочеш змінити?\n"
+)
 
-📊 **Рівень досвіду:** {experience_map.get(db_user.experience_level, 'Не вказано')}
 
-💊 **Особливості здоров'я:** {health_info}
+def _update_profile(telegram_id: int, **fields) -> Optional[Row]:
+    """
+    Write profile fields and get back the columns the profile card shows,
+    in one UPDATE ... RETURNING round trip. Blocking: run in a thread.
+    """
+    stmt = (
+        update(User)
+        .where(User.telegram_id == telegram_id)
+        .values(last_active=utcnow(), **fields)
+        .returning(*PROFILE_COLUMNS)
+    )
+    with SessionLocal() as db:
+        row = db.execute(stmt).first()
+        db.commit()
+        return row
 
-⌛ **Тривалість практики:** {db_user.available_duration or 'Не вказано'} хвилин
 
-Що хочеш змінити?
-"""
-            
-            keyboard = [
-                ['Цілі 🎯', 'Рівень досвіду 📊'],
-                ['Здоров\'я 💊', 'Тривалість ⌛'],
-                ['Назад 🔙', 'Готово ✅']
-            ]
-            reply_markup = ReplyKeyboardMarkup(keyboard, one_time_keyboard=True, resize_keyboard=True)
-            
-            await update.message.reply_text(profile_text, reply_markup=reply_markup, parse_mode='Markdown')
-            return PROFILE_MENU
+class ProfileHandler:
+    """Handles user profile viewing and editing"""
+    
+    def __init__(self, settings_command=None):
+        # Injected by bot.main() to avoid importing bot from handlers
+        self.settings_command = settings_command
+    
+    async def show_profile(self, update: Update, context: ContextTypes.DEFAULT_TYPE, db_user=None):
+        """
+        Show user profile with edit options
+        
+        Args:
+            db_user: Already loaded User, or a row of PROFILE_COLUMNS right
+                after an edit; looked up when omitted
+        """
+        if db_user is None:
+            db_user = await get_user_by_telegram_async(update.effective_user.id)
+        
+        if not db_user:
+            await update.message.reply_text(
+                "Спочатку потрібно пройти онбординг. Використай /start"
+            )
+            return ConversationHandler.END
+        
+        profile_text = PROFILE_TEMPLATE.format(
+            goals=db_user.goals or 'Не вказано',
+            level=EXPERIENCE_LABELS.get(db_user.experience_level, 'Не вказано'),
+            health=', '.join(db_user.health_conditions) if db_user.health_conditions else 'Немає',
+            duration=db_user.available_duration or 'Не вказано'
+        )
+        
+        await update.message.reply_text(profile_text, reply_markup=KB_PROFILE_MENU, parse_mode='Markdown')
+        return PROFILE_MENU
     
     async def handle_profile_menu(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle profile menu selection"""
         choice = update.message.text
         
         if choice == 'Готово ✅':
-            keyboard = [
-                ['Розпочати практику 🧘'],
-                ['Переглянути прогрес 📊', 'Мій профіль 👤'],
-                ['Налаштування ⚙️', 'Допомога 💡']
-            ]
-            reply_markup = ReplyKeyboardMarkup(keyboard, one_time_keyboard=False, resize_keyboard=True)
             await update.message.reply_text(
                 "Профіль збережено! 👍",
-                reply_markup=reply_markup
+                reply_markup=KB_MAIN
             )
             return ConversationHandler.END
         elif choice == 'Назад 🔙':
-            from bot import settings_command
-            await settings_command(update, context)
+            await self.settings_command(update, context)
             return ConversationHandler.END
         elif choice == 'Цілі 🎯':
             await update.message.reply_text(
@@ -96,15 +109,9 @@ class ProfileHandler:
             )
             return EDIT_GOALS
         elif choice == 'Рівень досвіду 📊':
-            keyboard = [
-                ['Повний новачок 🌱'],
-                ['Трохи практикував(ла) 🌿'],
-                ['Є досвід 🌳']
-            ]
-            reply_markup = ReplyKeyboardMarkup(keyboard, one_time_keyboard=True, resize_keyboard=True)
             await update.message.reply_text(
                 "Який у тебе рівень досвіду?",
-                reply_markup=reply_markup
+                reply_markup=KB_EXPERIENCE
             )
             return EDIT_EXPERIENCE
         elif choice == 'Здоров\'я 💊':
@@ -115,15 +122,9 @@ class ProfileHandler:
             )
             return EDIT_HEALTH
         elif choice == 'Тривалість ⌛':
-            keyboard = [
-                ['10-15 хвилин'],
-                ['20-30 хвилин'],
-                ['45-60 хвилин']
-            ]
-            reply_markup = ReplyKeyboardMarkup(keyboard, one_time_keyboard=True, resize_keyboard=True)
             await update.message.reply_text(
                 "Скільки часу ти готовий(а) приділяти практиці?",
-                reply_markup=reply_markup
+                reply_markup=KB_DURATION
             )
             return EDIT_DURATION
         else:
@@ -135,77 +136,45 @@ class ProfileHandler:
         user = update.effective_user
         new_goals = update.message.text
         
-        with SessionLocal() as db:
-            db_user = db.query(User).filter(User.telegram_id == user.id).first()
-            if db_user:
-                db_user.goals = new_goals
-                db_user.last_active = datetime.utcnow()
-                db.commit()
+        db_user = await asyncio.to_thread(_update_profile, user.id, goals=new_goals)
+        invalidate_user(user.id)
         
         await update.message.reply_text("Цілі оновлено! ✅")
-        return await self.show_profile(update, context)
+        return await self.show_profile(update, context, db_user=db_user)
     
     async def update_experience(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Update experience level"""
         user = update.effective_user
+        experience = EXPERIENCE_MAP.get(update.message.text, Experience.BEGINNER)
         
-        experience_map = {
-            'Повний новачок 🌱': 'beginner',
-            'Трохи практикував(ла) 🌿': 'intermediate',
-            'Є досвід 🌳': 'advanced'
-        }
-        
-        experience = experience_map.get(update.message.text, 'beginner')
-        
-        with SessionLocal() as db:
-            db_user = db.query(User).filter(User.telegram_id == user.id).first()
-            if db_user:
-                db_user.experience_level = experience
-                db_user.last_active = datetime.utcnow()
-                db.commit()
+        db_user = await asyncio.to_thread(_update_profile, user.id, experience_level=experience)
+        invalidate_user(user.id)
         
         await update.message.reply_text("Рівень досвіду оновлено! ✅")
-        return await self.show_profile(update, context)
+        return await self.show_profile(update, context, db_user=db_user)
     
     async def update_health(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Update health conditions"""
         user = update.effective_user
         health_info = update.message.text
         
-        with SessionLocal() as db:
-            db_user = db.query(User).filter(User.telegram_id == user.id).first()
-            if db_user:
-                if health_info.lower() not in ['немає', 'ні', 'no']:
-                    db_user.health_conditions = [health_info]
-                else:
-                    db_user.health_conditions = []
-                db_user.last_active = datetime.utcnow()
-                db.commit()
+        conditions = [health_info] if health_info.lower() not in ['немає', 'ні', 'no'] else []
+        db_user = await asyncio.to_thread(_update_profile, user.id, health_conditions=conditions)
+        invalidate_user(user.id)
         
         await update.message.reply_text("Інформацію про здоров'я оновлено! ✅")
-        return await self.show_profile(update, context)
+        return await self.show_profile(update, context, db_user=db_user)
     
     async def update_duration(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Update available duration"""
         user = update.effective_user
+        duration = DURATION_MAP.get(update.message.text, 15)
         
-        duration_map = {
-            '10-15 хвилин': 15,
-            '20-30 хвилин': 30,
-            '45-60 хвилин': 60
-        }
-        
-        duration = duration_map.get(update.message.text, 15)
-        
-        with SessionLocal() as db:
-            db_user = db.query(User).filter(User.telegram_id == user.id).first()
-            if db_user:
-                db_user.available_duration = duration
-                db_user.last_active = datetime.utcnow()
-                db.commit()
+        db_user = await asyncio.to_thread(_update_profile, user.id, available_duration=duration)
+        invalidate_user(user.id)
         
         await update.message.reply_text("Тривалість практики оновлено! ✅")
-        return await self.show_profile(update, context)
+        return await self.show_profile(update, context, db_user=db_user)
     
     async def cancel_profile_edit(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Cancel profile editing"""
@@ -2,11 +2,15 @@
 Reminders management handler
 Allows users to set practice reminders
 """
-from telegram import Update, ReplyKeyboardMarkup, ReplyKeyboardRemove
+from telegram import Update, ReplyKeyboardRemove
 from telegram.ext import ContextTypes, ConversationHandler
-from database import SessionLocal, User
-from datetime import datetime, time
+from database import SessionLocal, User, ReminderFrequency, invalidate_user
+from handlers.keyboards import KB_MAIN_COMPACT, KB_REMINDER_FREQ_BACK
+from datetime import date, datetime
+from typing import Optional
+import asyncio
 import logging
+import re
 import pytz
 
 logger = logging.getLogger(__name__)
@@ -14,22 +18,88 @@ logger = logging.getLogger(__name__)
 # Reminder states
 REMINDER_FREQ, REMINDER_TIME = range(2)
 
+# Reminder time, HH:MM or H:MM within 00:00-23:59
+TIME_RE = re.compile(r'^([01]?\d|2[0-3]):([0-5]\d)$')
+KYIV_TZ = pytz.timezone('Europe/Kyiv')
+
+# Keyboard labels for reminder frequencies
+FREQUENCY_LABELS = {
+    ReminderFrequency.DAILY: 'Щодня',
+    ReminderFrequency.EVERY_OTHER_DAY: 'Через день',
+    ReminderFrequency.WEEKDAYS: 'По буднях',
+    ReminderFrequency.WEEKENDS: 'По вихідних',
+}
+FREQUENCY_BY_LABEL = {label: freq for freq, label in FREQUENCY_LABELS.items()}
+
+SWEEPER_JOB_NAME = "reminder_sweeper"
+# Reminders sent per second by the sweeper
+BROADCAST_BATCH_SIZE = 30
+REMINDER_TEXT = (
+    "Привіт! Час для твоєї практики йоги. Твоє тіло та розум будуть вдячні! 🙏🧘‍♂️\n\n"
+    "Натисни /practice, щоб почати."
+)
+
+
+def reminder_anchor_date() -> date:
+    """Today's Kyiv date, stored when a reminder schedule is (re)set"""
+    return datetime.now(KYIV_TZ).date()
+
+
+def _due_frequencies(now: datetime) -> list:
+    """Reminder frequencies that can fire on the (Kyiv) date of `now`"""
+    due = [ReminderFrequency.DAILY, ReminderFrequency.EVERY_OTHER_DAY]
+    due.append(ReminderFrequency.WEEKDAYS if now.weekday() < 5 else ReminderFrequency.WEEKENDS)
+    return due
+
+
+def _is_due(frequency: ReminderFrequency, anchor: Optional[date], today: date) -> bool:
+    """EVERY_OTHER_DAY fires on even day offsets from the anchor; the rest every matched day"""
+    if frequency != ReminderFrequency.EVERY_OTHER_DAY:
+        return True
+    if anchor is None:
+        # Schedules saved before anchors existed keep the old calendar parity
+        return today.toordinal() % 2 == 0
+    return (today - anchor).days % 2 == 0
+
+
+def _due_reminder_ids(now: datetime) -> list:
+    """Telegram ids of users whose reminder is due at `now`. Blocking: run in a thread."""
+    with SessionLocal() as db:
+        rows = db.query(User.telegram_id, User.reminder_frequency, User.reminder_anchor_date).filter(
+            User.notifications_enabled == True,
+            User.reminder_hour == now.hour,
+            User.reminder_minute == now.minute,
+            User.reminder_frequency.in_(_due_frequencies(now))
+        ).all()
+    today = now.date()
+    return [
+        telegram_id for telegram_id, frequency, anchor in rows
+        if _is_due(frequency, anchor, today)
+    ]
+
+
+def _save_reminder_settings(telegram_id: int, **fields) -> bool:
+    """Write reminder fields in a single UPDATE. Blocking: run in a thread."""
+    with SessionLocal() as db:
+        updated = db.query(User).filter(User.telegram_id == telegram_id).update(
+            fields, synchronize_session=False
+        )
+        db.commit()
+        return bool(updated)
+
+
 class RemindersHandler:
     """Handles setting up practice reminders"""
     
+    def __init__(self, settings_command=None):
+        # Injected by bot.main() to avoid importing bot from handlers
+        self.settings_command = settings_command
+    
     async def start_reminder_settings(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Start reminder setup flow"""
-        keyboard = [
-            ['Щодня', 'Через день'],
-            ['По буднях', 'По вихідних'],
-            ['Вимкнути нагадування ❌'],
-            ['Назад 🔙']
-        ]
-        reply_markup = ReplyKeyboardMarkup(keyboard, one_time_keyboard=True, resize_keyboard=True)
-        
         await update.message.reply_text(
             "Як часто ти хочеш отримувати нагадування про практику? 🧘‍♂️",
-            reply_markup=reply_markup
+            reply_markup=KB_REMINDER_FREQ_BACK
         )
         return REMINDER_FREQ
 
@@ -38,31 +108,19 @@ class RemindersHandler:
         choice = update.message.text
         
         if choice == 'Назад 🔙':
-            from bot import settings_command
-            await settings_command(update, context)
+            await self.settings_command(update, context)
             return ConversationHandler.END
             
         if choice == 'Вимкнути нагадування ❌':
             user = update.effective_user
-            with SessionLocal() as db:
-                db_user = db.query(User).filter(User.telegram_id == user.id).first()
-                if db_user:
-                    db_user.notifications_enabled = False
-                    db.commit()
-                    # Remove scheduled job
-                    self.remove_user_reminder(context, user.id)
+            if await asyncio.to_thread(_save_reminder_settings, user.id, notifications_enabled=False):
+                invalidate_user(user.id)
             
-            keyboard = [
-                ['Розпочати практику 🧘'],
-                ['Переглянути прогрес 📊', 'Мій профіль 👤'],
-                ['Допомога 💡']
-            ]
-            reply_markup = ReplyKeyboardMarkup(keyboard, one_time_keyboard=False, resize_keyboard=True)
-            await update.message.reply_text("Нагадування вимкнено. 🔇", reply_markup=reply_markup)
+            await update.message.reply_text("Нагадування вимкнено. 🔇", reply_markup=KB_MAIN_COMPACT)
             return ConversationHandler.END
 
         # Store frequency in user_data
-        context.user_data['temp_reminder_freq'] = choice
+        context.user_data['temp_reminder_freq'] = FREQUENCY_BY_LABEL.get(choice, ReminderFrequency.DAILY)
         
         await update.message.reply_text(
             "Введи час нагадування у форматі ГГ:ХХ (наприклад, 08:30 або 19:00):",
@@ -72,87 +130,64 @@ class RemindersHandler:
 
     async def handle_time(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle time input and finish setup"""
-        time_text = update.message.text
         user = update.effective_user
         
-        try:
-            # Validate time format
-            hour, minute = map(int, time_text.split(':'))
-            if not (0 <= hour <= 23 and 0 <= minute <= 59):
-                raise ValueError
-            
-            freq = context.user_data.get('temp_reminder_freq')
-            
-            with SessionLocal() as db:
-                db_user = db.query(User).filter(User.telegram_id == user.id).first()
-                if db_user:
-                    db_user.reminder_frequency = freq
-                    db_user.reminder_time = f"{hour:02d}:{minute:02d}"
-                    db_user.notifications_enabled = True
-                    db.commit()
-            
-            # Schedule the job
-            self.schedule_user_reminder(context, user.id, hour, minute, freq)
-            
-            keyboard = [
-                ['Розпочати практику 🧘'],
-                ['Переглянути прогрес 📊', 'Мій профіль 👤'],
-                ['Допомога 💡']
-            ]
-            reply_markup = ReplyKeyboardMarkup(keyboard, one_time_keyboard=False, resize_keyboard=True)
-            
-            await update.message.reply_text(
-                f"Чудово! Я нагадуватиму тобі про практику: **{freq}** о **{hour:02d}:{minute:02d}**. 🙏",
-                reply_markup=reply_markup,
-                parse_mode='Markdown'
-            )
-            return ConversationHandler.END
-            
-        except ValueError:
+        # Same validation as the onboarding reminder time
+        match = TIME_RE.match(update.message.text.strip())
+        if not match:
             await update.message.reply_text(
                 "Будь ласка, введи час у правильному форматі ГГ:ХХ (наприклад, 09:00):"
             )
             return REMINDER_TIME
-
-    def schedule_user_reminder(self, context, user_id, hour, minute, frequency):
-        """Schedule a recurring message for the user"""
-        job_name = f"reminder_{user_id}"
         
-        # Determine job_queue (can be context or application)
-        job_queue = context.job_queue if hasattr(context, 'job_queue') else context
+        hour, minute = int(match.group(1)), int(match.group(2))
+        freq = context.user_data.get('temp_reminder_freq')
         
-        # Remove existing job if any
-        self.remove_user_reminder(context, user_id)
+        if await asyncio.to_thread(
+            _save_reminder_settings, user.id,
+            reminder_frequency=freq, reminder_hour=hour, reminder_minute=minute,
+            reminder_anchor_date=reminder_anchor_date(), notifications_enabled=True
+        ):
+            invalidate_user(user.id)
         
-        kyiv_tz = pytz.timezone('Europe/Kyiv')
-        reminder_time = time(hour=hour, minute=minute, tzinfo=kyiv_tz)
-        
-        # Determine frequency logic
-        if frequency == 'Щодня':
-            job_queue.run_daily(self.send_reminder, reminder_time, chat_id=user_id, name=job_name)
-        elif frequency == 'Через день':
-            # run_repeating with interval of 2 days
-            # We use first to set the clock time
-            job_queue.run_repeating(self.send_reminder, interval=172800, first=reminder_time, chat_id=user_id, name=job_name)
-        elif frequency == 'По буднях':
-            job_queue.run_daily(self.send_reminder, reminder_time, days=(0, 1, 2, 3, 4), chat_id=user_id, name=job_name)
-        elif frequency == 'По вихідних':
-            job_queue.run_daily(self.send_reminder, reminder_time, days=(5, 6), chat_id=user_id, name=job_name)
-        else:
-            job_queue.run_daily(self.send_reminder, reminder_time, chat_id=user_id, name=job_name)
-
-    def remove_user_reminder(self, context, user_id):
-        """Remove existing reminder job"""
-        job_name = f"reminder_{user_id}"
-        job_queue = context.job_queue if hasattr(context, 'job_queue') else context
-        current_jobs = job_queue.get_jobs_by_name(job_name)
-        for job in current_jobs:
-            job.schedule_removal()
-
-    async def send_reminder(self, context: ContextTypes.DEFAULT_TYPE):
-        """Job callback to send the reminder"""
-        job = context.job
-        await context.bot.send_message(
-            chat_id=job.chat_id,
-            text="Привіт! Час для твоєї практики йоги. Твоє тіло та розум будуть вдячні! 🙏🧘‍♂️\n\nНатисни /practice, щоб почати."
+        await update.message.reply_text(
+            f"Чудово! Я нагадуватиму тобі про практику: **{FREQUENCY_LABELS.get(freq, freq)}** о **{hour:02d}:{minute:02d}**. 🙏",
+            reply_markup=KB_MAIN_COMPACT,
+            parse_mode='Markdown'
         )
+        return ConversationHandler.END
+
+    def start_sweeper(self, job_queue):
+        """
+        Start the single job that sends all reminders. It ticks once a
+        minute, just after the minute starts, and looks up who is due.
+        """
+        now = datetime.now(KYIV_TZ)
+        job_queue.run_repeating(
+            self.sweep_reminders,
+            interval=60,
+            # Second 1 of the next minute, or of this one if it just started
+            # (61 s would skip it: reminders match the exact hour and minute)
+            first=(60 - now.second) % 60 + 1,
+            name=SWEEPER_JOB_NAME
+        )
+
+    async def sweep_reminders(self, context: ContextTypes.DEFAULT_TYPE):
+        """Job callback: send the reminders due this minute"""
+        now = datetime.now(KYIV_TZ)
+        due = await asyncio.to_thread(_due_reminder_ids, now)
+        if not due:
+            return
+        
+        logger.info("Sending %d reminders for %02d:%02d", len(due), now.hour, now.minute)
+        for i in range(0, len(due), BROADCAST_BATCH_SIZE):
+            if i:
+                # Stay under Telegram's global limit of ~30 messages per second
+                await asyncio.sleep(1)
+            results = await asyncio.gather(*(
+                context.bot.send_message(chat_id=telegram_id, text=REMINDER_TEXT)
+                for telegram_id in due[i:i + BROADCAST_BATCH_SIZE]
+            ), return_exceptions=True)
+            for telegram_id, result in zip(due[i:i + BROADCAST_BATCH_SIZE], results):
+                if isinstance(result, Exception):
+                    logger.warning("Failed to send reminder to %s: %s", telegram_id, result)
@@ -2,81 +2,29 @@
 Start and basic command handlers
 """
 from telegram import Update
-from telegram.ext import ContextTypes
-from database import SessionLocal, User
-from datetime import datetime
+from telegram.ext import ContextTypes, ConversationHandler
+from telegram.helpers import escape_markdown
+from sqlalchemy import case
+from database import (
+    AsyncSessionLocal, User, get_cached_user, get_cached_state, cache_state, invalidate_user, touch_user, upsert, utcnow
+)
+from handlers.keyboards import KB_MAIN
+from handlers.onboarding_handler import O_GOALS
 import logging
 
 logger = logging.getLogger(__name__)
 
+# SQL form of _has_completed_onboarding
+ONBOARDING_DONE = (
+    User.goals.is_not(None) &
+    User.experience_level.is_not(None) &
+    User.available_duration.is_not(None)
+)
 
-async def show_main_menu(update: Update, context: ContextTypes.DEFAULT_TYPE, text: str = "Обери дію:"):
-    """Show the main menu keyboard"""
-    from telegram import ReplyKeyboardMarkup
-    keyboard = [
-        ['Розпочати практику 🧘'],
-        ['Переглянути прогрес 📊', 'Мій профіль 👤'],
-        ['Налаштування ⚙️', 'Допомога 💡']
-    ]
-    reply_markup = ReplyKeyboardMarkup(keyboard, one_time_keyboard=False, resize_keyboard=True)
-    await update.message.reply_text(text, reply_markup=reply_markup)
-
-
-async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """
-    Handle /start command
-    Creates new user or welcomes back existing user
-    """
-    from handlers.onboarding_handler import O_GOALS
-    from telegram.ext import ConversationHandler
-
-    try:
-        print(f"DEBUG: Processing /start for user {update.effective_user.id}")
-        user = update.effective_user
-        
-        def has_completed_onboarding(db_user):
-            """Check if user has completed onboarding"""
-            return (
-                db_user.goals is not None and
-                db_user.experience_level is not None and
-                db_user.available_duration is not None
-            )
-        
-        with SessionLocal() as db:
-            # Check if user exists
-            db_user = db.query(User).filter(User.telegram_id == user.id).first()
-            
-            if db_user and has_completed_onboarding(db_user):
-                # Existing user who completed onboarding
-                db_user.last_active = datetime.utcnow()
-                db.commit()
-                
-                await show_main_menu(update, context)
-                logger.info(f"Existing user {user.id} accessed main menu via /start")
-                return ConversationHandler.END
-            else:
-                # New user or user who didn't complete onboarding
-                if not db_user:
-                    # Create new user
-                    new_user = User(
-                        telegram_id=user.id,
-                        username=user.username,
-                        first_name=user.first_name,
-                        last_name=user.last_name,
-                        current_state='onboarding_start'
-                    )
-                    db.add(new_user)
-                    db.commit()
-                    logger.info(f"New user {user.id} created")
-                else:
-                    # User exists but didn't complete onboarding
-                    db_user.last_active = datetime.utcnow()
-                    db_user.current_state = 'onboarding_start'
-                    db.commit()
-                    logger.info(f"User {user.id} restarting incomplete onboarding")
-                
-                welcome_message = f"""
-✨ **Привіт, {user.first_name}!** 🙏
+# Greeting for new users and unfinished onboarding; formatted with the
+# Markdown-escaped first_name
+WELCOME_TEMPLATE = """
+✨ **Привіт, {first_name}!** 🙏
 
 Ласкаво просимо до твого простору йоги та усвідомленості. Я — твій персональний AI-провідник, створений для того, щоб зробити твою практику гармонійною, регулярною та надихаючою.
 
@@ -90,20 +38,12 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 **Розкажи, що привело тебе до йоги?** Що б ти хотів(ла) змінити або відчути завдяки практиці? (Наприклад: спокій, гнучкість, енергію...)
 """
-                await update.message.reply_text(welcome_message, parse_mode='Markdown')
-                
-                # Return O_GOALS state to start conversation
-                return O_GOALS
-
-    except Exception as e:
-        logger.error(f"Error in start_command: {e}", exc_info=True)
-        await update.message.reply_text("Вибач, сталася помилка. Спробуй ще раз пізніше.")
-        return ConversationHandler.END
 
+# Characters escape_markdown (Markdown V1) changes; most names have none
+_MARKDOWN_SPECIAL = frozenset('_*`[')
 
-async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Handle /help command"""
-    help_text = """
+# /help reply
+HELP_TEXT = """
 🧘 **Доступні команди:**
 
 /start - Почати спочатку
@@ -125,4 +65,103 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 💡 **Потрібна допомога?**
 Просто напиши мені своє питання!
 """
-    await update.message.reply_text(help_text, parse_mode='Markdown')
+
+
+async def show_main_menu(update: Update, context: ContextTypes.DEFAULT_TYPE, text: str = "Обери дію:"):
+    """Show the main menu keyboard"""
+    await update.message.reply_text(text, reply_markup=KB_MAIN)
+
+
+def _has_completed_onboarding(db_user) -> bool:
+    """Check if user has completed onboarding"""
+    return (
+        db_user.goals is not None and
+        db_user.experience_level is not None and
+        db_user.available_duration is not None
+    )
+
+
+async def _register_visit(tg_user) -> bool:
+    """
+    Create or touch the user's row on /start
+    
+    Returns:
+        True if the user has already completed onboarding
+    """
+    # Returning users are served from the user cache; last_active is
+    # written by the periodic activity flush
+    cached_user = get_cached_user(tg_user.id)
+    if cached_user and _has_completed_onboarding(cached_user):
+        touch_user(tg_user.id)
+        return True
+    
+    # Users repeating /start mid-onboarding are already at its start, so
+    # there is nothing to write until onboarding completes (which busts this)
+    if get_cached_state(tg_user.id) == 'onboarding_start':
+        touch_user(tg_user.id)
+        return False
+    
+    # One statement creates a new user or refreshes an existing one;
+    # users who didn't complete onboarding are sent back to its start
+    stmt = upsert(
+        User,
+        dict(
+            telegram_id=tg_user.id,
+            username=tg_user.username,
+            first_name=tg_user.first_name,
+            last_name=tg_user.last_name,
+            current_state='onboarding_start'
+        ),
+        ['telegram_id'],
+        {
+            'last_active': utcnow(),
+            'current_state': case((ONBOARDING_DONE, User.current_state), else_='onboarding_start'),
+        }
+    ).returning(User.goals, User.experience_level, User.available_duration)
+    async with AsyncSessionLocal() as db:
+        # Checked in Python: SQLite (3.40) misevaluates IS NULL in RETURNING of an insert
+        row = (await db.execute(stmt)).one()
+        await db.commit()
+    
+    if _has_completed_onboarding(row):
+        return True
+    invalidate_user(tg_user.id)
+    cache_state(tg_user.id, 'onboarding_start')
+    logger.info("User %s starting onboarding", tg_user.id)
+    return False
+
+
+async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Handle /start command
+    Creates new user or welcomes back existing user
+    """
+    try:
+        logger.debug("Processing /start for user %s", update.effective_user.id)
+        user = update.effective_user
+        
+        if await _register_visit(user):
+            # Existing user who completed onboarding
+            await show_main_menu(update, context)
+            logger.info("Existing user %s accessed main menu via /start", user.id)
+            return ConversationHandler.END
+        
+        # New user or user who didn't complete onboarding
+        # Names like "Anna_K" would otherwise break Markdown parsing and the reply
+        first_name = user.first_name
+        if _MARKDOWN_SPECIAL.intersection(first_name):
+            first_name = escape_markdown(first_name)
+        await update.message.reply_text(WELCOME_TEMPLATE.format(first_name=first_name), parse_mode='Markdown')
+        
+        # Return O_GOALS state to start conversation
+        return O_GOALS
+
+    except Exception as e:
+        logger.error("Error in start_command: %s", e, exc_info=True)
+        await update.message.reply_text("Вибач, сталася помилка. Спробуй ще раз пізніше.")
+        return ConversationHandler.END
+
+
+async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /help command"""
+    await update.message.reply_text(HELP_TEXT, parse_mode='Markdown')
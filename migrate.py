@@ -1,14 +1,194 @@
+import re
 from database.database import engine
-from sqlalchemy import text
+from database.models import Practice, User
+from sqlalchemy import Integer, inspect, text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.schema import CreateIndex
+
+# Indexes added after the initial schema (create_all only covers new tables)
+INDEXES = [
+    ("ix_practice_user_completed_date",
+     "CREATE INDEX IF NOT EXISTS ix_practice_user_completed_date "
+     "ON practices (user_id, completed, completed_at DESC)"),
+    # Partial index: built from the model so the WHERE literal matches the dialect
+    ("ix_practice_user_incomplete",
+     CreateIndex(next(i for i in Practice.__table__.indexes if i.name == "ix_practice_user_incomplete"),
+                 if_not_exists=True)),
+    ("ix_users_reminder_time",
+     "CREATE INDEX IF NOT EXISTS ix_users_reminder_time ON users (reminder_hour, reminder_minute)"),
+    ("ix_progress_user_module",
+     "CREATE UNIQUE INDEX IF NOT EXISTS ix_progress_user_module ON user_progress (user_id, module_id)"),
+    ("ix_progress_user_status",
+     "CREATE INDEX IF NOT EXISTS ix_progress_user_status ON user_progress (user_id, status)"),
+]
+
+# The unique index on users.telegram_id; INCLUDE (id) is rendered on PostgreSQL only
+TG_COVERING_INDEX = next(i for i in User.__table__.indexes if i.name == "ix_users_tg_covering")
+
+# Indexes that are no longer declared on the models
+DROPPED_INDEXES = [
+    # (telegram_id, is_active) from an earlier schema: no query filters on is_active
+    "ix_users_tg_active",
+]
+
+# Columns added to users after the initial schema: name -> DDL type and default
+USER_COLUMNS = {
+    "reminder_frequency": "VARCHAR(50) DEFAULT 'daily'",
+    "reminder_hour": "SMALLINT",
+    "reminder_minute": "SMALLINT",
+    "reminder_anchor_date": "DATE",
+}
+
+# JSON columns stored as JSONB on PostgreSQL
+JSONB_COLUMNS = [
+    ("users", "goals"),
+    ("users", "health_conditions"),
+    ("modules", "topics"),
+    ("modules", "prerequisites"),
+    ("practices", "practice_content"),
+    ("practices", "challenges"),
+    ("user_progress", "strengths"),
+    ("user_progress", "areas_to_improve"),
+]
+
+# Old string values of enum-like columns -> SMALLINT codes
+# (see database.models.Experience / ReminderFrequency)
+ENUM_COLUMNS = {
+    "experience_level": {"beginner": 1, "intermediate": 2, "advanced": 3},
+    "reminder_frequency": {
+        "off": 0, "daily": 1, "Щодня": 1, "Через день": 2, "По буднях": 3, "По вихідних": 4,
+    },
+}
 
 def migrate():
-    try:
-        with engine.connect() as conn:
-            conn.execute(text("ALTER TABLE users ADD COLUMN reminder_frequency VARCHAR(50) DEFAULT 'daily'"))
-            conn.commit()
-            print("Successfully added reminder_frequency column")
-    except Exception as e:
-        print(f"Error or column already exists: {e}")
+    add_user_columns()
+    migrate_reminder_time()
+    migrate_enum_columns()
+
+    for name, ddl in INDEXES:
+        try:
+            with engine.connect() as conn:
+                conn.execute(text(ddl) if isinstance(ddl, str) else ddl)
+                conn.commit()
+                print(f"Successfully created {name} index")
+        except Exception as e:
+            print(f"Error creating {name} index: {e}")
+
+    migrate_telegram_id_index()
+    drop_indexes()
+
+    if engine.dialect.name == 'postgresql':
+        migrate_jsonb()
+
+
+def add_user_columns():
+    """Add missing USER_COLUMNS in one transaction, skipping those that exist"""
+    with engine.begin() as conn:
+        # The inspector reads information_schema on PostgreSQL, PRAGMA table_info on SQLite
+        existing = {column["name"] for column in inspect(conn).get_columns("users")}
+        for column, ddl in USER_COLUMNS.items():
+            if column in existing:
+                continue
+            conn.execute(text(f"ALTER TABLE users ADD COLUMN {column} {ddl}"))
+            print(f"Successfully added {column} column")
+
+
+def migrate_reminder_time():
+    """Split the old reminder_time string ("HH:MM") into hour/minute columns"""
+    with engine.begin() as conn:
+        if "reminder_time" not in {column["name"] for column in inspect(conn).get_columns("users")}:
+            return
+        rows = conn.execute(text(
+            "SELECT id, reminder_time FROM users "
+            "WHERE reminder_time IS NOT NULL AND reminder_hour IS NULL"
+        )).all()
+        for user_id, reminder_time in rows:
+            match = re.match(r'^(\d{1,2}):(\d{2})$', reminder_time.strip())
+            if not match:
+                continue
+            conn.execute(
+                text("UPDATE users SET reminder_hour = :h, reminder_minute = :m WHERE id = :id"),
+                {"h": int(match.group(1)), "m": int(match.group(2)), "id": user_id}
+            )
+        print(f"Successfully copied reminder_time for {len(rows)} users")
+
+
+def migrate_enum_columns():
+    """Convert string experience/frequency values to integer codes in one transaction"""
+    with engine.begin() as conn:
+        types = {column["name"]: column["type"] for column in inspect(conn).get_columns("users")}
+        for column, codes in ENUM_COLUMNS.items():
+            params = {f"v{i}": value for i, value in enumerate(codes)}
+            whens = " ".join(
+                f"WHEN {column} = :v{i} THEN {code}" for i, code in enumerate(codes.values())
+            )
+            case = f"CASE {whens} ELSE NULL END"
+            if engine.dialect.name == 'postgresql':
+                # Already converted: the CASE would compare integers with text
+                if isinstance(types[column], Integer):
+                    continue
+                conn.execute(text(
+                    f"ALTER TABLE users ALTER COLUMN {column} DROP DEFAULT"
+                ))
+                conn.execute(text(
+                    f"ALTER TABLE users ALTER COLUMN {column} TYPE SMALLINT USING ({case})"
+                ).bindparams(**params))
+            else:
+                # SQLite columns are dynamically typed, rewrite remaining string values in place
+                placeholders = ", ".join(f":v{i}" for i in range(len(codes)))
+                conn.execute(text(
+                    f"UPDATE users SET {column} = {case} WHERE {column} IN ({placeholders})"
+                ), params)
+            print(f"Successfully converted {column} to integer codes")
+
+
+def migrate_jsonb():
+    """Convert JSON columns to JSONB and index health conditions in one transaction (PostgreSQL)"""
+    with engine.begin() as conn:
+        inspector = inspect(conn)
+        for table, column in JSONB_COLUMNS:
+            types = {c["name"]: c["type"] for c in inspector.get_columns(table)}
+            # ALTER ... TYPE rewrites the whole table, so only run it once
+            if isinstance(types[column], JSONB):
+                continue
+            conn.execute(text(
+                f"ALTER TABLE {table} ALTER COLUMN {column} TYPE JSONB USING {column}::jsonb"
+            ))
+            print(f"Successfully converted {table}.{column} to JSONB")
+
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_users_health_gin ON users USING gin (health_conditions)"
+        ))
+        print("Successfully created ix_users_health_gin index")
+
+
+def migrate_telegram_id_index():
+    """
+    Make ix_users_tg_covering the only unique index on telegram_id, in one
+    transaction. It replaces ix_users_telegram_id of the original schema and,
+    on PostgreSQL, the users_telegram_id_key constraint of later ones. On SQLite
+    that constraint's autoindex can't be dropped without a table rebuild, so
+    it is kept and the covering index is not added next to it.
+    """
+    with engine.begin() as conn:
+        has_sqlite_constraint = engine.dialect.name == 'sqlite' and any(
+            constraint["column_names"] == ["telegram_id"]
+            for constraint in inspect(conn).get_unique_constraints("users")
+        )
+        if not has_sqlite_constraint:
+            conn.execute(CreateIndex(TG_COVERING_INDEX, if_not_exists=True))
+        conn.execute(text("DROP INDEX IF EXISTS ix_users_telegram_id"))
+        if engine.dialect.name == 'postgresql':
+            conn.execute(text("ALTER TABLE users DROP CONSTRAINT IF EXISTS users_telegram_id_key"))
+        print("Successfully made ix_users_tg_covering the telegram_id unique index")
+
+
+def drop_indexes():
+    """Drop DROPPED_INDEXES that still exist, in one transaction"""
+    with engine.begin() as conn:
+        for name in DROPPED_INDEXES:
+            conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+            print(f"Successfully dropped {name} index")
 
 if __name__ == "__main__":
     migrate()
@@ -13,8 +13,6 @@ async def set_bot_profile():
         logger.error("TELEGRAM_BOT_TOKEN not found in config")
         return
 
-    bot = Bot(token=Config.TELEGRAM_BOT_TOKEN)
-    
     try:
         # 1. Set Bot Name
         name = "Yoga AI Assistant"
@@ -26,18 +24,37 @@ async def set_bot_profile():
             "Допомагаю створювати індивідуальні практики, відстежувати прогрес та "
             "знаходити гармонію кожного дня. Натисни /start, щоб почати подорож! ✨"
         )
-        await bot.set_my_description(description=description)
-        logger.info("Bot description updated successfully")
-
+        
         # 3. Set Bot Short Description (Seen on the bot's profile page / 'About' section)
         short_description = "AI Yoga Coach: персональні практики, прогрес та гармонія. 🌿"
-        await bot.set_my_short_description(short_description=short_description)
-        logger.info("Bot short description updated successfully")
         
-        print("BOT PROFILE UPDATED SUCCESSFULLY")
+        # One Bot for both calls, its HTTP session is closed on exit.
+        # The calls are independent, so they are sent concurrently
+        async with Bot(token=Config.TELEGRAM_BOT_TOKEN) as bot:
+            results = await asyncio.gather(
+                bot.set_my_description(description=description),
+                bot.set_my_short_description(short_description=short_description),
+                return_exceptions=True
+            )
+        
+        failed = False
+        for label, result in zip(("description", "short description"), results):
+            if isinstance(result, Exception):
+                failed = True
+                logger.error("Error updating bot %s: %s", label, result)
+            else:
+                logger.info("Bot %s updated successfully", label)
+        
+        if not failed:
+            print("BOT PROFILE UPDATED SUCCESSFULLY")
         
     except Exception as e:
-        logger.error(f"Error updating bot profile: {e}")
+        logger.error("Error updating bot profile: %s", e)
 
 if __name__ == "__main__":
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:  # optional, not available on Windows
+        pass
     asyncio.run(set_bot_profile())
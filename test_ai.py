@@ -1,7 +1,7 @@
 import asyncio
 import os
 from dotenv import load_dotenv
-from openai import AsyncOpenAI
+from ai import get_claude_client
 
 # Load environment variables
 load_dotenv()
@@ -14,10 +14,8 @@ async def test_ai_connection():
 
     print(f"Testing OpenRouter with key: {api_key[:8]}...")
     
-    client = AsyncOpenAI(
-        base_url="https://openrouter.ai/api/v1",
-        api_key=api_key,
-    )
+    # The bot's own OpenRouter client: same base URL, key and connection pool
+    client = get_claude_client().client
 
     try:
         response = await client.chat.completions.create(
@@ -35,4 +33,9 @@ async def test_ai_connection():
         traceback.print_exc()
 
 if __name__ == "__main__":
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:  # optional, not available on Windows
+        pass
     asyncio.run(test_ai_connection())
@@ -1,7 +1,7 @@
 import asyncio
 import os
 from dotenv import load_dotenv
-from ai import ClaudeClient
+from ai import get_claude_client
 import logging
 
 # Setup logging
@@ -10,7 +10,7 @@ logger = logging.getLogger(__name__)
 
 async def test_general_chat():
     load_dotenv()
-    client = ClaudeClient()
+    client = get_claude_client()
     
     user_profile = {
         'goals': 'Розтяжка',
@@ -35,4 +35,9 @@ async def test_general_chat():
         traceback.print_exc()
 
 if __name__ == "__main__":
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:  # optional, not available on Windows
+        pass
     asyncio.run(test_general_chat())
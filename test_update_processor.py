@@ -0,0 +1,40 @@
+import asyncio
+from datetime import datetime
+from telegram import Chat, Message, Update
+from verify_startup import PerChatUpdateProcessor
+
+def make_update(update_id: int, chat_id: int) -> Update:
+    chat = Chat(chat_id, Chat.PRIVATE)
+    return Update(update_id, message=Message(update_id, datetime.now(), chat))
+
+async def test_blocked_chat_does_not_stall_others():
+    # Fewer slots than chat 1 has queued updates
+    processor = PerChatUpdateProcessor(2)
+    release = asyncio.Event()
+    handled = []
+
+    async def handle(update_id: int, chat_id: int):
+        if chat_id == 1:
+            # A slow handler, e.g. a long practice generation
+            await release.wait()
+        handled.append(update_id)
+
+    tasks = [
+        asyncio.create_task(processor.process_update(make_update(i, 1), handle(i, 1)))
+        for i in range(1, 6)
+    ]
+    await asyncio.sleep(0)
+
+    # Chat 2 gets a slot while chat 1's burst waits behind its first update
+    await asyncio.wait_for(processor.process_update(make_update(6, 2), handle(6, 2)), timeout=1)
+    assert handled == [6], handled
+
+    # Chat 1 then runs in arrival order
+    release.set()
+    await asyncio.gather(*tasks)
+    assert handled == [6, 1, 2, 3, 4, 5], handled
+    assert not processor._chat_locks
+    print("Success! Other chats are served while one chat is blocked.")
+
+if __name__ == "__main__":
+    asyncio.run(test_blocked_chat_does_not_stall_others())
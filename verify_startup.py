@@ -1,37 +1,159 @@
 
+import asyncio
 import logging
+from functools import lru_cache
+from typing import Optional
 from config import Config
 from database import init_db
-from telegram.ext import Application
+from migrate import migrate
+from telegram import Update
+from telegram.ext import Application, BaseUpdateProcessor
+from telegram.request import HTTPXRequest
+from ai.claude_client import HTTP2_AVAILABLE
 import sys
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+try:
+    import orjson
+except ImportError:  # optional, PTB falls back to stdlib json
+    orjson = None
+
 logger = logging.getLogger(__name__)
 
-def verify_startup():
-    try:
-        logger.info("Checking configuration...")
-        Config.validate()
-        logger.info("Configuration valid.")
+# Updates handled at the same time across all chats
+MAX_CONCURRENT_UPDATES = 256
+
+# Connections for outgoing Bot API calls: one per concurrently handled update.
+# The builder only defaults to 256 for requests it creates itself; the
+# HTTPXRequest built below (for HTTP/2 and the timeouts) defaults to 1
+TELEGRAM_POOL_SIZE = MAX_CONCURRENT_UPDATES
+
+class OrjsonHTTPXRequest(HTTPXRequest):
+    """HTTPXRequest that parses Bot API responses (including updates) with orjson"""
+
+    @staticmethod
+    def parse_json_payload(payload: bytes):
+        try:
+            return orjson.loads(payload)
+        except orjson.JSONDecodeError:
+            # PTB decodes leniently, then logs and raises its usual error
+            return HTTPXRequest.parse_json_payload(payload)
+
+# Request class for the Bot API; PTB's default when orjson is not installed
+REQUEST_CLASS = OrjsonHTTPXRequest if orjson else HTTPXRequest
+
+class PerChatUpdateProcessor(BaseUpdateProcessor):
+    """
+    Handle updates from different chats concurrently, so a slow DB or AI call
+    in one chat doesn't hold up others, while updates from the same chat
+    still run one at a time in arrival order (conversation state relies on it)
+    """
+
+    def __init__(self, max_concurrent_updates: int):
+        super().__init__(max_concurrent_updates)
+        # chat id -> [lock, number of updates holding or waiting for it]
+        self._chat_locks = {}
+
+    async def process_update(self, update, coroutine):
+        # Replaces the base version (marked final for type checkers) to take the
+        # chat's lock before a slot of the shared limit: updates queued behind a
+        # slow handler in one chat must not hold the slots other chats need
+        chat = update.effective_chat if isinstance(update, Update) else None
+        if chat is None:
+            await super().process_update(update, coroutine)
+            return
+
+        entry = self._chat_locks.setdefault(chat.id, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                await super().process_update(update, coroutine)
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._chat_locks[chat.id]
+
+    async def do_process_update(self, update, coroutine):
+        await coroutine
+
+    async def initialize(self):
+        """Nothing to set up"""
 
-        logger.info("Initializing database...")
-        init_db()
-        logger.info("Database initialized.")
+    async def shutdown(self):
+        """Nothing to clean up"""
 
-        logger.info("Checking Telegram Bot Token...")
-        if not Config.TELEGRAM_BOT_TOKEN:
-             raise ValueError("Bot token missing")
+@lru_cache(maxsize=1)
+def _validated_token() -> str:
+    """
+    Validate configuration and initialize the database, once per process
+
+    Returns:
+        The bot token; a failed check raises and is retried on the next call
+    """
+    logger.info("Checking configuration...")
+    Config.validate()
+    logger.info("Configuration valid.")
+
+    logger.info("Initializing database...")
+    init_db()
+    # create_all doesn't change existing tables: bring older databases up to date
+    migrate()
+    logger.info("Database initialized.")
+
+    logger.info("Checking Telegram Bot Token...")
+    if not Config.TELEGRAM_BOT_TOKEN:
+         raise ValueError("Bot token missing")
+    return Config.TELEGRAM_BOT_TOKEN
+
+def build_application(post_init=None, post_shutdown=None) -> Optional[Application]:
+    """
+    Validate configuration, initialize the database and build the bot Application
+
+    Shared by this check and bot.main(), so the process builds a single
+    Application (and HTTP client) at startup.
+
+    Args:
+        post_init: Optional Application.post_init callback
+        post_shutdown: Optional Application.post_shutdown callback
+
+    Returns:
+        The built Application, or None if verification failed
+    """
+    try:
+        token = _validated_token()
         
-        # Just build the app to check for immediate errors, don't run it
-        app = Application.builder().token(Config.TELEGRAM_BOT_TOKEN).build()
+        # getUpdates keeps its own default-sized request: a long poll holds its connection
+        request = REQUEST_CLASS(
+            connection_pool_size=TELEGRAM_POOL_SIZE,
+            http_version="2" if HTTP2_AVAILABLE else "1.1",
+            read_timeout=20,
+            write_timeout=20,
+            pool_timeout=5,
+        )
+        builder = (
+            Application.builder().token(token)
+            .request(request).get_updates_request(REQUEST_CLASS())
+            .concurrent_updates(PerChatUpdateProcessor(MAX_CONCURRENT_UPDATES))
+        )
+        if post_init:
+            builder.post_init(post_init)
+        if post_shutdown:
+            builder.post_shutdown(post_shutdown)
+        app = builder.build()
         logger.info("Application built successfully.")
-        
-        print("VERIFICATION SUCCESSFUL")
-        return 0
+        return app
     except Exception as e:
-        logger.error(f"Verification failed: {e}")
+        logger.error("Verification failed: %s", e)
+        return None
+
+def verify_startup():
+    # Build the app to check for immediate errors, don't run it
+    if build_application() is None:
         return 1
 
+    print("VERIFICATION SUCCESSFUL")
+    return 0
+
 if __name__ == "__main__":
+    # Configure logging
+    logging.basicConfig(level=logging.INFO)
     sys.exit(verify_startup())